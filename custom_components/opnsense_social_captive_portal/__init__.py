@@ -1,24 +1,60 @@
 """The Captive Portal integration."""
 from __future__ import annotations
 
+import asyncio
+import base64
 import logging
-from datetime import timedelta
+from datetime import datetime, timedelta
 
 import aiohttp
+import voluptuous as vol
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import Platform
-from homeassistant.core import HomeAssistant
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP, Platform
+from homeassistant.core import Event, HomeAssistant, ServiceCall, callback
+from homeassistant.exceptions import ServiceValidationError
+import homeassistant.helpers.config_validation as cv
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
 
 from .const import (
     DOMAIN,
     CONF_HOST,
     CONF_PORT,
+    CONF_SOURCE,
+    CONF_API_KEY,
+    CONF_API_SECRET,
+    CONF_VERIFY_SSL,
+    CONF_SSL,
     DEFAULT_PORT,
+    DEFAULT_OPNSENSE_PORT,
+    SOURCE_OPNSENSE,
     SCAN_INTERVAL,
     API_STATUS,
+    API_PHOTO,
+    STATUS_FIELDS,
+    PHOTO_FETCH_CONCURRENCY,
+    EVENT_ARRIVED,
+    EVENT_DEPARTED,
+    EVENT_PRESENCE_BATCH,
+    OPT_IN_STORAGE_VERSION,
+    SIGNAL_PEOPLE_UPDATED,
+    SERVICE_OPT_IN_PERSON,
+    ATTR_PERSON_ID,
+    ATTR_ENTRY_ID,
+    CONF_RECORD_TRAFFIC,
+    DEFAULT_RECORD_TRAFFIC,
+    SERVICE_REPLAY,
+    ATTR_PATH,
+    ATTR_SPEED,
+    REPLAY_CHUNK_RECORDS,
 )
+from .occupancy import OccupancyTracker
+from .opnsense import OpnsenseError, OpnsenseSource
+from .recording import TrafficRecorder, iter_recording, read_chunk, recording_path
+from .usage import UsageAggregator
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -28,10 +64,11 @@ PLATFORMS: list[Platform] = [Platform.SENSOR, Platform.BINARY_SENSOR, Platform.D
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Captive Portal from a config entry."""
-    host = entry.data[CONF_HOST]
-    port = entry.data.get(CONF_PORT, DEFAULT_PORT)
-    
-    coordinator = CaptivePortalCoordinator(hass, host, port)
+    coordinator = CaptivePortalCoordinator(hass, entry)
+    await coordinator.async_load_opted_in()
+    await coordinator.occupancy.async_load()
+    if coordinator.opnsense is not None:
+        await coordinator.opnsense.async_load()
     await coordinator.async_config_entry_first_refresh()
 
     hass.data.setdefault(DOMAIN, {})
@@ -41,14 +78,100 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     }
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
+
+    if (recorder := coordinator.recorder) is not None:
+        # Entries are not unloaded on shutdown, so flush the buffer on stop too
+        async def _async_flush_recording(_event: Event) -> None:
+            await recorder.async_flush()
+
+        entry.async_on_unload(
+            hass.bus.async_listen(EVENT_HOMEASSISTANT_STOP, _async_flush_recording)
+        )
+
+    if not hass.services.has_service(DOMAIN, SERVICE_OPT_IN_PERSON):
+        _async_register_services(hass)
     
     return True
 
 
+def _async_register_services(hass: HomeAssistant) -> None:
+    """Register integration services."""
+
+    async def _async_opt_in_person(call: ServiceCall) -> None:
+        """Create entities for a guest when running in residents-only mode."""
+        person_id = str(call.data[ATTR_PERSON_ID])
+
+        for entry_id, entry_data in list(hass.data.get(DOMAIN, {}).items()):
+            if call.data.get(ATTR_ENTRY_ID) not in (None, entry_id):
+                continue
+            coordinator: CaptivePortalCoordinator = entry_data["coordinator"]
+            coordinator.async_opt_in(person_id)
+
+    async def _async_replay(call: ServiceCall) -> None:
+        """Feed a traffic recording through the coordinator."""
+        if (path := call.data.get(ATTR_PATH)) and not hass.config.is_allowed_path(path):
+            raise ServiceValidationError(
+                f"Cannot read {path}, add it to allowlist_external_dirs first"
+            )
+
+        coordinators: list[CaptivePortalCoordinator] = [
+            entry_data["coordinator"]
+            for entry_id, entry_data in hass.data.get(DOMAIN, {}).items()
+            if call.data.get(ATTR_ENTRY_ID) in (None, entry_id)
+        ]
+        if any(coordinator.replaying for coordinator in coordinators):
+            raise ServiceValidationError("A replay is already running")
+
+        for coordinator in coordinators:
+            await coordinator.async_replay(
+                path or recording_path(hass, coordinator.entry_id),
+                call.data[ATTR_SPEED],
+            )
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_REPLAY,
+        _async_replay,
+        schema=vol.Schema(
+            {
+                vol.Optional(ATTR_ENTRY_ID): cv.string,
+                vol.Optional(ATTR_PATH): cv.string,
+                vol.Optional(ATTR_SPEED, default=0): vol.All(
+                    vol.Coerce(float), vol.Range(min=0)
+                ),
+            }
+        ),
+    )
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_OPT_IN_PERSON,
+        _async_opt_in_person,
+        schema=vol.Schema(
+            {
+                vol.Required(ATTR_PERSON_ID): cv.string,
+                vol.Optional(ATTR_ENTRY_ID): cv.string,
+            }
+        ),
+    )
+
+
+async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload the config entry when its options change."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
-        hass.data[DOMAIN].pop(entry.entry_id)
+        coordinator = hass.data[DOMAIN].pop(entry.entry_id)["coordinator"]
+        # Options changes reload the entry; the new one must load current state
+        await coordinator.occupancy.async_save()
+        if coordinator.opnsense is not None:
+            await coordinator.opnsense.async_save()
+        if coordinator.recorder is not None:
+            await coordinator.recorder.async_flush()
     
     return unload_ok
 
@@ -56,7 +179,7 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 class CaptivePortalCoordinator(DataUpdateCoordinator):
     """Coordinator for Captive Portal data."""
 
-    def __init__(self, hass: HomeAssistant, host: str, port: int) -> None:
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
         """Initialize the coordinator."""
         super().__init__(
             hass,
@@ -64,20 +187,337 @@ class CaptivePortalCoordinator(DataUpdateCoordinator):
             name=DOMAIN,
             update_interval=timedelta(seconds=SCAN_INTERVAL),
         )
-        self.host = host
-        self.port = port
-        self.base_url = f"http://{host}:{port}"
+        self.entry = entry
+        self.host = entry.data[CONF_HOST]
+        self.entry_id = entry.entry_id
+        # Guests opted in with the opt_in_person service; kept out of the
+        # entry options so opting someone in doesn't reload the entry
+        self.opted_in: set[str] = set()
+        self._opt_in_store = Store(
+            hass, OPT_IN_STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}.opted_in"
+        )
+        self.opnsense: OpnsenseSource | None = None
+
+        if entry.data.get(CONF_SOURCE) == SOURCE_OPNSENSE:
+            self.port = entry.data.get(CONF_PORT, DEFAULT_OPNSENSE_PORT)
+            self.opnsense = OpnsenseSource(
+                hass,
+                self.host,
+                self.port,
+                entry.data[CONF_API_KEY],
+                entry.data[CONF_API_SECRET],
+                entry.data.get(CONF_VERIFY_SSL, True),
+                entry.data.get(CONF_SSL, True),
+                self.entry_id,
+            )
+        else:
+            self.port = entry.data.get(CONF_PORT, DEFAULT_PORT)
+
+        self.base_url = f"http://{self.host}:{self.port}"
         self.session = async_get_clientsession(hass)
+        # person_id -> (photo_hash, data URI) for photos already downloaded
+        self._photos: dict[str, tuple[str, str]] = {}
+        # person_id -> photo_hash from the latest snapshot
+        self._photo_hashes: dict[str, str] = {}
+        # person_id -> photo_hash whose download failed; retried once the hash changes
+        self._photo_failed: dict[str, str] = {}
+        # People with an entity showing their photo; nobody else is downloaded
+        self._photo_wanted: set[str] = set()
+        self._photo_semaphore = asyncio.Semaphore(PHOTO_FETCH_CONCURRENCY)
+        self._photo_task: asyncio.Task | None = None
+        self.occupancy = OccupancyTracker(hass, self.entry_id)
+        self.usage = UsageAggregator()
+        self.recorder: TrafficRecorder | None = None
+        if entry.options.get(CONF_RECORD_TRAFFIC, DEFAULT_RECORD_TRAFFIC):
+            self.recorder = TrafficRecorder(hass, entry)
+        # True while async_replay is feeding recorded snapshots through
+        self.replaying = False
+        # IDs of people online in the previous snapshot (None before the first one)
+        self._online: set[str] | None = None
+        # (event_type, event_data) from the latest snapshot, fired once the
+        # entities have written the new states
+        self._pending_events: list[tuple[str, dict]] = []
 
     async def _async_update_data(self) -> dict:
+        """Fetch data from the configured data source."""
+        if self.opnsense is not None:
+            try:
+                data = await self.opnsense.async_fetch_status()
+            except OpnsenseError as err:
+                raise UpdateFailed(str(err)) from err
+        else:
+            data = await self._async_fetch_portal_status()
+
+        now = dt_util.utcnow()
+        if self.recorder is not None:
+            self.recorder.record(data, now)
+        if self.opnsense is None:
+            self._attach_photos(data.get("people", []))
+            self._async_schedule_photo_fetch()
+
+        self._process_snapshot(data, now)
+        return data
+
+    async def async_load_opted_in(self) -> None:
+        """Load the guests that were opted in."""
+        if (stored := await self._opt_in_store.async_load()) is not None:
+            self.opted_in = set(stored.get("people", []))
+
+    @callback
+    def async_opt_in(self, person_id: str) -> None:
+        """Opt a guest in and have the platforms add their entities in place."""
+        if person_id in self.opted_in:
+            return
+        self.opted_in.add(person_id)
+        self._opt_in_store.async_delay_save(
+            lambda: {"people": sorted(self.opted_in)}, 0
+        )
+        async_dispatcher_send(self.hass, SIGNAL_PEOPLE_UPDATED.format(self.entry_id))
+
+    async def async_shutdown(self) -> None:
+        """Cancel the background photo download."""
+        await super().async_shutdown()
+        if self._photo_task is not None:
+            self._photo_task.cancel()
+
+    def _process_snapshot(
+        self, data: dict, now: datetime, fire_events: bool = True
+    ) -> None:
+        """Update presence, occupancy and usage from a status snapshot."""
+        self._process_presence(data.get("people", []), now, fire_events)
+        self.usage.ingest(data.get("sessions", []), now)
+
+    async def async_replay(self, path: str, speed: float) -> None:
+        """Feed the snapshots recorded at ``path`` through the coordinator.
+
+        ``speed`` is a multiple of real time; 0 replays as fast as possible.
+        Polling is paused during the replay and photos are not fetched.
+        The replay runs against its own occupancy tracker and usage
+        aggregator, which are never persisted, fires no events and creates
+        no entities for people who only appear in the recording. Live state
+        is restored afterwards and polling picks up where it left off.
+        The recording is streamed in chunks of REPLAY_CHUNK_RECORDS.
+        """
+        # Checked and set before the first await, so replays can't overlap
+        if self.replaying:
+            raise ServiceValidationError("A replay is already running")
+        self.replaying = True
+
+        update_interval = self.update_interval
+        live = (self.data, self._online, self.occupancy, self.usage)
+        self.update_interval = None
+        self._online = None
+        self.occupancy = OccupancyTracker(self.hass)
+        self.usage = UsageAggregator()
+        records = iter_recording(path)
+        count = 0
+        try:
+            previous = None
+            while chunk := await self.hass.async_add_executor_job(
+                read_chunk, records, REPLAY_CHUNK_RECORDS
+            ):
+                for timestamp, data in chunk:
+                    if speed and previous is not None and timestamp > previous:
+                        await asyncio.sleep((timestamp - previous) / speed)
+                    else:
+                        await asyncio.sleep(0)
+                    previous = timestamp
+
+                    self._process_snapshot(
+                        data, dt_util.utc_from_timestamp(timestamp), fire_events=False
+                    )
+                    self.async_set_updated_data(data)
+                    count += 1
+        finally:
+            await self.hass.async_add_executor_job(records.close)
+            _LOGGER.info("Replayed %s snapshots from %s", count, path)
+            data, self._online, self.occupancy, self.usage = live
+            self.update_interval = update_interval
+            self.replaying = False
+            if data is not None:
+                self.async_set_updated_data(data)
+            await self.async_request_refresh()
+
+    async def _async_fetch_portal_status(self) -> dict:
         """Fetch data from the Captive Portal API."""
         try:
             async with self.session.get(
                 f"{self.base_url}{API_STATUS}",
+                params={"fields": ",".join(STATUS_FIELDS)},
                 timeout=aiohttp.ClientTimeout(total=10)
             ) as response:
                 if response.status != 200:
                     raise UpdateFailed(f"Error fetching data: {response.status}")
-                return await response.json()
+                data = await response.json()
         except aiohttp.ClientError as err:
             raise UpdateFailed(f"Error communicating with API: {err}") from err
+
+        return data
+
+    def _process_presence(
+        self, people: list[dict], now: datetime, fire_events: bool = True
+    ) -> None:
+        """Diff presence against the previous snapshot and update aggregates."""
+        online = {str(person.get("id")) for person in people if person.get("online")}
+
+        if self._online is None:
+            self.occupancy.seed(online, now)
+        else:
+            arrived = online - self._online
+            departed = self._online - online
+            self.occupancy.apply(arrived, departed, now)
+            if fire_events and (arrived or departed):
+                self._queue_presence_events(people, arrived, departed)
+
+        self._online = online
+
+    def _queue_presence_events(
+        self, people: list[dict], arrived: set[str], departed: set[str]
+    ) -> None:
+        """Queue one event per transition plus a single batch event."""
+        changed = arrived | departed
+        by_id = {
+            person_id: person
+            for person in people
+            if (person_id := str(person.get("id"))) in changed
+        }
+
+        def _event_data(person_id: str) -> dict:
+            person = by_id.get(person_id, {})
+            return {
+                "entry_id": self.entry_id,
+                "person_id": person_id,
+                "person_name": person.get("name"),
+                "phone_mac": person.get("phone_mac"),
+            }
+
+        arrivals = [_event_data(person_id) for person_id in sorted(arrived)]
+        departures = [_event_data(person_id) for person_id in sorted(departed)]
+
+        self._pending_events.extend((EVENT_ARRIVED, data) for data in arrivals)
+        self._pending_events.extend((EVENT_DEPARTED, data) for data in departures)
+        self._pending_events.append(
+            (
+                EVENT_PRESENCE_BATCH,
+                {
+                    "entry_id": self.entry_id,
+                    "arrived": arrivals,
+                    "departed": departures,
+                },
+            )
+        )
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Update entities, then fire the presence events from the refresh.
+
+        Events are fired only after coordinator.data is set and the entities
+        have written their new states, so an automation triggered by an
+        event sees states that agree with it.
+        """
+        super().async_update_listeners()
+        events, self._pending_events = self._pending_events, []
+        for event_type, data in events:
+            self.hass.bus.async_fire(event_type, data)
+
+    def _attach_photos(self, people: list[dict]) -> None:
+        """Attach cached photos to people and note which hashes are current.
+
+        The status endpoint only returns a photo_hash per person. Photos are
+        downloaded in the background, outside the refresh, and only for
+        people that have an entity (see async_want_photo).
+        """
+        hashes: dict[str, str] = {}
+
+        for person in people:
+            # Older portal versions ignore the projection and inline the photo
+            if "photo" in person:
+                continue
+
+            person_id = str(person.get("id"))
+            if not (photo_hash := person.get("photo_hash")):
+                person["photo"] = None
+                continue
+
+            hashes[person_id] = photo_hash
+            # Keep showing the previous photo until a changed one arrives
+            cached = self._photos.get(person_id)
+            person["photo"] = cached[1] if cached else None
+
+        self._photo_hashes = hashes
+
+        # Forget photos and failures for people who no longer have a photo
+        for cache in (self._photos, self._photo_failed):
+            for person_id in cache.keys() - hashes.keys():
+                del cache[person_id]
+
+    @callback
+    def async_want_photo(self, person_id: str) -> None:
+        """Mark a person's photo as shown by an entity and fetch it if needed."""
+        self._photo_wanted.add(person_id)
+        self._async_schedule_photo_fetch()
+
+    def _pending_photos(self) -> list[tuple[str, str]]:
+        """Return (person_id, photo_hash) pairs that need downloading."""
+        pending = []
+        for person_id in self._photo_wanted:
+            if (photo_hash := self._photo_hashes.get(person_id)) is None:
+                continue
+            cached = self._photos.get(person_id)
+            if cached and cached[0] == photo_hash:
+                continue
+            if self._photo_failed.get(person_id) == photo_hash:
+                continue
+            pending.append((person_id, photo_hash))
+        return pending
+
+    @callback
+    def _async_schedule_photo_fetch(self) -> None:
+        """Start the background photo download unless it is already running."""
+        if self._photo_task is not None and not self._photo_task.done():
+            # The running task picks up new work before it finishes
+            return
+        if not self._pending_photos():
+            return
+        self._photo_task = self.hass.async_create_background_task(
+            self._async_fetch_photos(), f"{DOMAIN} photo fetch"
+        )
+
+    async def _async_fetch_photos(self) -> None:
+        """Download pending photos and push them to the entities."""
+        while pending := self._pending_photos():
+            await asyncio.gather(
+                *(self._async_fetch_photo(*item) for item in pending)
+            )
+
+            if self.data is not None:
+                for person in self.data.get("people", []):
+                    cached = self._photos.get(str(person.get("id")))
+                    if cached and cached[0] == person.get("photo_hash"):
+                        person["photo"] = cached[1]
+            self.async_update_listeners()
+
+    async def _async_fetch_photo(self, person_id: str, photo_hash: str) -> None:
+        """Download a single photo and cache it as a data URI."""
+        async with self._photo_semaphore:
+            try:
+                async with self.session.get(
+                    f"{self.base_url}{API_PHOTO.format(person_id=person_id)}",
+                    timeout=aiohttp.ClientTimeout(total=10)
+                ) as response:
+                    if response.status != 200:
+                        _LOGGER.debug(
+                            "Error fetching photo for %s: %s", person_id, response.status
+                        )
+                        self._photo_failed[person_id] = photo_hash
+                        return
+                    content_type = response.content_type or "image/jpeg"
+                    body = await response.read()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+                _LOGGER.debug("Error fetching photo for %s: %s", person_id, err)
+                self._photo_failed[person_id] = photo_hash
+                return
+
+        photo = f"data:{content_type};base64,{base64.b64encode(body).decode()}"
+        self._photos[person_id] = (photo_hash, photo)
+        self._photo_failed.pop(person_id, None)
@@ -6,13 +6,26 @@ from homeassistant.components.binary_sensor import (
     BinarySensorDeviceClass,
 )
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from . import CaptivePortalCoordinator
-from .const import DOMAIN
+from .const import (
+    DOMAIN,
+    CONF_PRESENCE_ENTITIES,
+    DEFAULT_PRESENCE_ENTITIES,
+    SIGNAL_PEOPLE_UPDATED,
+)
 from .device import hub_device_info, person_device_info
+from .entity import (
+    async_add_entities_batched,
+    async_remove_person_entities,
+    clean_name,
+    hidden_person_ids,
+    include_person,
+)
 
 
 async def async_setup_entry(
@@ -36,45 +49,65 @@ async def async_setup_entry(
         hass.data[DOMAIN][entry.entry_id]["created_people"] = set()
 
     created_people = hass.data[DOMAIN][entry.entry_id]["created_people"]
+    presence_entities = entry.options.get(CONF_PRESENCE_ENTITIES, DEFAULT_PRESENCE_ENTITIES)
     
     def _create_person_sensors():
         """Create sensors for any new people."""
-        if coordinator.data is None:
-            return []
+        # Sites that only use the arrival/departure events can skip these
+        if coordinator.data is None or not presence_entities:
+            return
         
         people = coordinator.data.get("people", [])
-        new_sensors = []
         
         for person in people:
             person_id = person.get("id")
-            if person_id and person_id not in created_people:
+            if person_id and person_id not in created_people and include_person(coordinator, person):
                 created_people.add(person_id)
-                new_sensors.append(
-                    CaptivePortalPersonPresenceSensor(
-                        coordinator,
-                        entry,
-                        person,
-                    )
+                yield CaptivePortalPersonPresenceSensor(
+                    coordinator,
+                    entry,
+                    person,
                 )
-        
-        return new_sensors
-    
-    # Add initial person sensors
-    initial_person_sensors = _create_person_sensors()
-    sensors.extend(initial_person_sensors)
     
     async_add_entities(sensors)
+
+    # Drop presence sensors that are switched off or belong to hidden guests
+    hidden = hidden_person_ids(coordinator)
+    async_remove_person_entities(
+        hass,
+        entry,
+        "binary_sensor",
+        ("person_",),
+        lambda person_id: presence_entities and person_id not in hidden,
+    )
+
+    # Add initial person sensors in batches
+    await async_add_entities_batched(async_add_entities, _create_person_sensors())
     
     # Listen for coordinator updates to add new people
-    async def _async_update_listener():
+    @callback
+    def _async_update_listener():
         """Handle updated data from the coordinator."""
-        new_sensors = _create_person_sensors()
-        if new_sensors:
-            async_add_entities(new_sensors)
+        # People who only appear in a replayed recording don't get entities
+        if coordinator.replaying:
+            return
+        if new_sensors := list(_create_person_sensors()):
+            # Tied to the entry, so unloading cancels a batch still being added
+            entry.async_create_background_task(
+                hass,
+                async_add_entities_batched(async_add_entities, new_sensors),
+                f"{DOMAIN} add binary_sensor entities",
+            )
     
     entry.async_on_unload(
         coordinator.async_add_listener(_async_update_listener)
     )
+    # Guests opted in later are added without reloading the entry
+    entry.async_on_unload(
+        async_dispatcher_connect(
+            hass, SIGNAL_PEOPLE_UPDATED.format(entry.entry_id), _async_update_listener
+        )
+    )
 
 
 class CaptivePortalApprovalPendingSensor(CoordinatorEntity, BinarySensorEntity):
@@ -132,15 +165,16 @@ class CaptivePortalPersonPresenceSensor(CoordinatorEntity, BinarySensorEntity):
         self._person_name = person_data.get("name", "Unknown")
         self._entry = entry
         
-        # Clean name for entity_id
-        clean_name = self._person_name.lower().replace(" ", "_")
-        clean_name = "".join(c for c in clean_name if c.isalnum() or c == "_")
-        
         self._attr_name = f"{self._person_name} Presence"
         self._attr_unique_id = f"{entry.entry_id}_person_{self._person_id}"
         self._attr_icon = "mdi:account"
-        self.entity_id = f"binary_sensor.social_captive_portal_{clean_name}_presence"
+        self.entity_id = f"binary_sensor.social_captive_portal_{clean_name(self._person_name)}_presence"
     
+    async def async_added_to_hass(self) -> None:
+        """Ask the coordinator to download this person's photo."""
+        await super().async_added_to_hass()
+        self.coordinator.async_want_photo(str(self._person_id))
+
     @property
     def is_on(self) -> bool | None:
         """Return true if person is home (phone detected)."""
@@ -9,10 +9,32 @@ import voluptuous as vol
 
 from homeassistant import config_entries
 from homeassistant.const import CONF_HOST, CONF_PORT
+from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
 
-from .const import DOMAIN, DEFAULT_PORT, API_STATUS
+from .const import (
+    DOMAIN,
+    DEFAULT_PORT,
+    DEFAULT_OPNSENSE_PORT,
+    API_STATUS,
+    CONF_SOURCE,
+    CONF_API_KEY,
+    CONF_API_SECRET,
+    CONF_VERIFY_SSL,
+    CONF_SSL,
+    SOURCE_PORTAL,
+    SOURCE_OPNSENSE,
+    CONF_PRESENCE_ENTITIES,
+    DEFAULT_PRESENCE_ENTITIES,
+    CONF_RESIDENTS_ONLY,
+    DEFAULT_RESIDENTS_ONLY,
+    CONF_GUEST_PHONE_SENSORS,
+    DEFAULT_GUEST_PHONE_SENSORS,
+    CONF_RECORD_TRAFFIC,
+    DEFAULT_RECORD_TRAFFIC,
+)
+from .opnsense import OpnsenseAuthError, OpnsenseError, OpnsenseSource
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -23,16 +45,44 @@ STEP_USER_DATA_SCHEMA = vol.Schema(
     }
 )
 
+STEP_OPNSENSE_DATA_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_HOST): str,
+        vol.Optional(CONF_PORT, default=DEFAULT_OPNSENSE_PORT): int,
+        vol.Required(CONF_API_KEY): str,
+        vol.Required(CONF_API_SECRET): str,
+        vol.Optional(CONF_SSL, default=True): bool,
+        vol.Optional(CONF_VERIFY_SSL, default=True): bool,
+    }
+)
+
 
 class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Handle a config flow for Captive Portal."""
 
     VERSION = 1
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,
+    ) -> OptionsFlowHandler:
+        """Get the options flow for this handler."""
+        return OptionsFlowHandler()
+
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
-        """Handle the initial step."""
+        """Handle the initial step: pick a data source."""
+        return self.async_show_menu(
+            step_id="user",
+            menu_options=[SOURCE_PORTAL, SOURCE_OPNSENSE],
+        )
+
+    async def async_step_portal(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Handle connecting to the Captive Portal server."""
         errors: dict[str, str] = {}
 
         if user_input is not None:
@@ -53,7 +103,7 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
                         return self.async_create_entry(
                             title=f"Captive Portal ({host})",
-                            data=user_input
+                            data={**user_input, CONF_SOURCE: SOURCE_PORTAL}
                         )
                     else:
                         errors["base"] = "cannot_connect"
@@ -64,10 +114,101 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 errors["base"] = "unknown"
 
         return self.async_show_form(
-            step_id="user",
+            step_id="portal",
             data_schema=STEP_USER_DATA_SCHEMA,
             errors=errors,
             description_placeholders={
                 "default_port": str(DEFAULT_PORT),
             },
         )
+
+    async def async_step_opnsense(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Handle connecting directly to the OPNsense API."""
+        errors: dict[str, str] = {}
+
+        if user_input is not None:
+            host = user_input[CONF_HOST]
+            port = user_input.get(CONF_PORT, DEFAULT_OPNSENSE_PORT)
+
+            # Test the API credentials against the session and ARP endpoints
+            try:
+                source = OpnsenseSource(
+                    self.hass,
+                    host,
+                    port,
+                    user_input[CONF_API_KEY],
+                    user_input[CONF_API_SECRET],
+                    user_input.get(CONF_VERIFY_SSL, True),
+                    user_input.get(CONF_SSL, True),
+                )
+                await source.async_fetch_status()
+            except OpnsenseAuthError:
+                errors["base"] = "invalid_auth"
+            except OpnsenseError:
+                errors["base"] = "cannot_connect"
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.exception("Unexpected exception")
+                errors["base"] = "unknown"
+            else:
+                await self.async_set_unique_id(f"opnsense:{host}:{port}")
+                self._abort_if_unique_id_configured()
+
+                return self.async_create_entry(
+                    title=f"OPNsense Captive Portal ({host})",
+                    data={**user_input, CONF_SOURCE: SOURCE_OPNSENSE}
+                )
+
+        return self.async_show_form(
+            step_id="opnsense",
+            data_schema=STEP_OPNSENSE_DATA_SCHEMA,
+            errors=errors,
+        )
+
+
+class OptionsFlowHandler(config_entries.OptionsFlow):
+    """Handle options for Captive Portal."""
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Manage the options."""
+        if user_input is not None:
+            return self.async_create_entry(title="", data=user_input)
+
+        options = self.config_entry.options
+        schema: dict[Any, Any] = {
+            vol.Optional(
+                CONF_PRESENCE_ENTITIES,
+                default=options.get(
+                    CONF_PRESENCE_ENTITIES, DEFAULT_PRESENCE_ENTITIES
+                ),
+            ): bool,
+        }
+
+        # OPNsense doesn't tell residents from guests, so these don't apply
+        if self.config_entry.data.get(CONF_SOURCE) != SOURCE_OPNSENSE:
+            schema[
+                vol.Optional(
+                    CONF_RESIDENTS_ONLY,
+                    default=options.get(CONF_RESIDENTS_ONLY, DEFAULT_RESIDENTS_ONLY),
+                )
+            ] = bool
+            schema[
+                vol.Optional(
+                    CONF_GUEST_PHONE_SENSORS,
+                    default=options.get(
+                        CONF_GUEST_PHONE_SENSORS, DEFAULT_GUEST_PHONE_SENSORS
+                    ),
+                )
+            ] = bool
+
+        schema[
+            vol.Optional(
+                CONF_RECORD_TRAFFIC,
+                default=options.get(CONF_RECORD_TRAFFIC, DEFAULT_RECORD_TRAFFIC),
+            )
+        ] = bool
+
+        return self.async_show_form(step_id="init", data_schema=vol.Schema(schema))
@@ -3,8 +3,28 @@
 DOMAIN = "captive_portal"
 CONF_HOST = "host"
 CONF_PORT = "port"
+CONF_SOURCE = "source"
+CONF_API_KEY = "api_key"
+CONF_API_SECRET = "api_secret"
+CONF_VERIFY_SSL = "verify_ssl"
+CONF_SSL = "ssl"
+
+# Data sources
+SOURCE_PORTAL = "portal"
+SOURCE_OPNSENSE = "opnsense"
+
+# Options
+CONF_PRESENCE_ENTITIES = "presence_entities"
+DEFAULT_PRESENCE_ENTITIES = True
+CONF_RESIDENTS_ONLY = "residents_only"
+DEFAULT_RESIDENTS_ONLY = False
+CONF_GUEST_PHONE_SENSORS = "guest_phone_sensors"
+DEFAULT_GUEST_PHONE_SENSORS = True
+CONF_RECORD_TRAFFIC = "record_traffic"
+DEFAULT_RECORD_TRAFFIC = False
 
 DEFAULT_PORT = 3000
+DEFAULT_OPNSENSE_PORT = 443
 SCAN_INTERVAL = 10  # seconds
 
 # API Endpoints
@@ -12,6 +32,64 @@ API_STATUS = "/api/ha/status"
 API_PENDING = "/api/admin/pending"
 API_APPROVE = "/api/admin/approve"
 API_DENY = "/api/admin/deny"
+API_PHOTO = "/api/ha/photo/{person_id}"
+
+# OPNsense API Endpoints
+OPNSENSE_API_SESSIONS = "/api/captiveportal/session/search"
+OPNSENSE_API_ARP = "/api/diagnostics/interface/getArp"
+OPNSENSE_API_NDP = "/api/diagnostics/interface/getNdp"
+
+# OPNsense MAC -> person index storage
+OPNSENSE_INDEX_STORAGE_VERSION = 1
+OPNSENSE_INDEX_SAVE_DELAY = 300  # seconds
+OPNSENSE_INDEX_TTL = 30 * 24 * 3600  # seconds since a MAC was last seen
+# Last-seen updates smaller than this don't trigger a save on their own
+OPNSENSE_INDEX_SEEN_RESOLUTION = 24 * 3600
+
+# Per-person fields requested from the status endpoint. Photos are left out
+# and fetched separately whenever photo_hash changes.
+STATUS_FIELDS = (
+    "id", "name", "phone_mac", "phone_count", "online", "resident", "photo_hash"
+)
+PHOTO_FETCH_CONCURRENCY = 4
+
+# Events fired on the Home Assistant event bus
+EVENT_ARRIVED = f"{DOMAIN}_arrived"
+EVENT_DEPARTED = f"{DOMAIN}_departed"
+EVENT_PRESENCE_BATCH = f"{DOMAIN}_presence_batch"
+
+# Usage aggregates: rolling window of fixed-size time buckets
+USAGE_BUCKET_SECONDS = 3600
+USAGE_BUCKET_COUNT = 24
+
+# Entities are added in batches of this size, yielding to the event loop
+ENTITY_BATCH_SIZE = 100
+
+# Services
+SERVICE_OPT_IN_PERSON = "opt_in_person"
+SERVICE_REPLAY = "replay"
+ATTR_PERSON_ID = "person_id"
+ATTR_ENTRY_ID = "entry_id"
+ATTR_PATH = "path"
+ATTR_SPEED = "speed"
+
+# Traffic recording
+RECORDING_MAX_BYTES = 5 * 1024 * 1024  # per file, compressed
+RECORDING_BACKUPS = 3
+RECORDING_FLUSH_RECORDS = 30
+# Snapshots decoded per executor job during replay, so a long recording is
+# streamed rather than loaded into memory at once
+REPLAY_CHUNK_RECORDS = 100
+
+# Guests opted in with the opt_in_person service
+OPT_IN_STORAGE_VERSION = 1
+
+# Dispatcher signal telling the platforms to look for new people to add
+SIGNAL_PEOPLE_UPDATED = f"{DOMAIN}_people_updated_{{}}"
+
+# Occupancy aggregates storage
+OCCUPANCY_STORAGE_VERSION = 1
+OCCUPANCY_SAVE_DELAY = 30  # seconds
 
 # Entity IDs
 SENSOR_PENDING = "pending_requests"
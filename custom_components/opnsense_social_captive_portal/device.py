@@ -4,25 +4,27 @@ from __future__ import annotations
 
 from homeassistant.helpers.device_registry import DeviceInfo
 
-from .const import DOMAIN, CONF_HOST, CONF_PORT
+from .const import DOMAIN, CONF_HOST, CONF_PORT, CONF_SOURCE, CONF_SSL, SOURCE_OPNSENSE
 
 
 def hub_device_info(entry) -> DeviceInfo:
     """Return DeviceInfo for the Captive Portal server (hub)."""
     host = entry.data.get(CONF_HOST)
     port = entry.data.get(CONF_PORT)
+    opnsense = entry.data.get(CONF_SOURCE) == SOURCE_OPNSENSE
 
     name = f"Captive Portal ({host})" if host else "Captive Portal"
 
     configuration_url = None
     if host and port:
-        configuration_url = f"http://{host}:{port}"
+        scheme = "https" if opnsense and entry.data.get(CONF_SSL, True) else "http"
+        configuration_url = f"{scheme}://{host}:{port}"
 
     return DeviceInfo(
         identifiers={(DOMAIN, entry.entry_id)},
         name=name,
-        manufacturer="Captive Portal",
-        model="Captive Portal Server",
+        manufacturer="OPNsense" if opnsense else "Captive Portal",
+        model="OPNsense Captive Portal" if opnsense else "Captive Portal Server",
         configuration_url=configuration_url,
     )
 
@@ -4,13 +4,21 @@ from __future__ import annotations
 from homeassistant.components.device_tracker import SourceType
 from homeassistant.components.device_tracker.config_entry import TrackerEntity
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from . import CaptivePortalCoordinator
-from .const import DOMAIN
+from .const import DOMAIN, SIGNAL_PEOPLE_UPDATED
 from .device import person_device_info
+from .entity import (
+    async_add_entities_batched,
+    async_remove_person_entities,
+    clean_name,
+    hidden_person_ids,
+    include_person,
+)
 
 
 async def async_setup_entry(
@@ -33,43 +41,65 @@ async def async_setup_entry(
     def _create_person_trackers():
         """Create device trackers for any new people with phones."""
         if coordinator.data is None:
-            return []
+            return
         
         people = coordinator.data.get("people", [])
-        new_trackers = []
         
         for person in people:
             person_id = person.get("id")
             phone_mac = person.get("phone_mac")
             
             # Only create tracker for people with phones who we haven't seen
-            if person_id and phone_mac and person_id not in created_trackers:
+            if (
+                person_id
+                and phone_mac
+                and person_id not in created_trackers
+                and include_person(coordinator, person)
+            ):
                 created_trackers.add(person_id)
-                new_trackers.append(
-                    CaptivePortalDeviceTracker(
-                        coordinator,
-                        entry,
-                        person,
-                    )
+                yield CaptivePortalDeviceTracker(
+                    coordinator,
+                    entry,
+                    person,
                 )
-        
-        return new_trackers
     
-    # Create initial trackers
-    initial_trackers = _create_person_trackers()
-    if initial_trackers:
-        async_add_entities(initial_trackers)
+    # Drop trackers for guests hidden by residents-only mode
+    hidden = hidden_person_ids(coordinator)
+    async_remove_person_entities(
+        hass,
+        entry,
+        "device_tracker",
+        ("tracker_",),
+        lambda person_id: person_id not in hidden,
+    )
+
+    # Create initial trackers in batches
+    await async_add_entities_batched(async_add_entities, _create_person_trackers())
     
     # Listen for coordinator updates to add new people
-    async def _async_update_listener():
+    @callback
+    def _async_update_listener():
         """Handle updated data from the coordinator."""
-        new_trackers = _create_person_trackers()
-        if new_trackers:
-            async_add_entities(new_trackers)
+        # People who only appear in a replayed recording don't get entities
+        if coordinator.replaying:
+            return
+        if new_trackers := list(_create_person_trackers()):
+            # Tied to the entry, so unloading cancels a batch still being added
+            entry.async_create_background_task(
+                hass,
+                async_add_entities_batched(async_add_entities, new_trackers),
+                f"{DOMAIN} add device_tracker entities",
+            )
     
     entry.async_on_unload(
         coordinator.async_add_listener(_async_update_listener)
     )
+    # Guests opted in later are added without reloading the entry
+    entry.async_on_unload(
+        async_dispatcher_connect(
+            hass, SIGNAL_PEOPLE_UPDATED.format(entry.entry_id), _async_update_listener
+        )
+    )
 
 
 class CaptivePortalDeviceTracker(CoordinatorEntity, TrackerEntity):
@@ -92,13 +122,16 @@ class CaptivePortalDeviceTracker(CoordinatorEntity, TrackerEntity):
         self._person_name = person_data.get("name", "Unknown")
         self._entry = entry
         
-        # Clean name for entity_id
-        clean_name = self._person_name.lower().replace(" ", "_")
-        clean_name = "".join(c for c in clean_name if c.isalnum() or c == "_")
-        
         self._attr_name = self._person_name
         self._attr_unique_id = f"{entry.entry_id}_tracker_{self._person_id}"
-        self.entity_id = f"device_tracker.social_captive_portal_{clean_name}"
+        self.entity_id = f"device_tracker.social_captive_portal_{clean_name(self._person_name)}"
+        # Built once here rather than on every state write
+        self._attr_device_info = person_device_info(entry, str(self._person_id), self._person_name)
+
+    async def async_added_to_hass(self) -> None:
+        """Ask the coordinator to download this person's photo."""
+        await super().async_added_to_hass()
+        self.coordinator.async_want_photo(str(self._person_id))
 
     @property
     def source_type(self) -> SourceType:
@@ -137,14 +170,6 @@ class CaptivePortalDeviceTracker(CoordinatorEntity, TrackerEntity):
                 return person.get("photo")
         return None
 
-
-    @property
-    def device_info(self):
-        """Return device information for the tracked person.
-
-        This registers a Device in Home Assistant and attaches this entity to it.
-        """
-        return person_device_info(self._entry, str(self._person_id), self._person_name)
     
     @property
     def location_name(self) -> str | None:
@@ -0,0 +1,149 @@
+"""Entity helpers for Captive Portal integration."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable, Iterable
+from typing import TYPE_CHECKING
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.entity import Entity
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .const import (
+    CONF_RESIDENTS_ONLY,
+    CONF_GUEST_PHONE_SENSORS,
+    DEFAULT_RESIDENTS_ONLY,
+    DEFAULT_GUEST_PHONE_SENSORS,
+    ENTITY_BATCH_SIZE,
+)
+from .device import person_device_info
+
+if TYPE_CHECKING:
+    from . import CaptivePortalCoordinator
+
+
+def clean_name(name: str) -> str:
+    """Return a person's name in a form usable in an entity_id."""
+    name = name.lower().replace(" ", "_")
+    return "".join(c for c in name if c.isalnum() or c == "_")
+
+
+class CaptivePortalPersonEntity(CoordinatorEntity):
+    """Base for an entity describing one person, on that person's device.
+
+    Subclasses set the platform, the unique ID prefix (which is what
+    async_remove_person_entities matches on) and the name suffix; the
+    entity_id is derived from the person's name and that suffix.
+    """
+
+    _entity_platform: str
+    _unique_id_prefix: str
+    _name_suffix: str
+
+    def __init__(
+        self,
+        coordinator: CaptivePortalCoordinator,
+        entry: ConfigEntry,
+        person_data: dict,
+    ) -> None:
+        """Initialize the entity."""
+        super().__init__(coordinator)
+        self._person_id = person_data.get("id")
+        self._person_name = person_data.get("name", "Unknown")
+
+        self._attr_name = f"{self._person_name} {self._name_suffix}"
+        self._attr_unique_id = f"{entry.entry_id}_{self._unique_id_prefix}{self._person_id}"
+        self.entity_id = (
+            f"{self._entity_platform}.social_captive_portal_"
+            f"{clean_name(self._person_name)}_{clean_name(self._name_suffix)}"
+        )
+        self._attr_device_info = person_device_info(entry, str(self._person_id), self._person_name)
+
+
+def is_resident(coordinator: CaptivePortalCoordinator, person: dict) -> bool:
+    """Return True for approved residents and guests that were opted in."""
+    return bool(person.get("resident")) or str(person.get("id")) in coordinator.opted_in
+
+
+def include_person(coordinator: CaptivePortalCoordinator, person: dict) -> bool:
+    """Return True if per-person entities should be created for this person.
+
+    In residents-only mode guests stay plain coordinator data until they are
+    opted in with the opt_in_person service. OPNsense has no notion of
+    residents, so the option does not apply to that source.
+    """
+    if coordinator.opnsense is not None or not coordinator.entry.options.get(
+        CONF_RESIDENTS_ONLY, DEFAULT_RESIDENTS_ONLY
+    ):
+        return True
+    return is_resident(coordinator, person)
+
+
+def hidden_person_ids(coordinator: CaptivePortalCoordinator) -> set[str]:
+    """Return IDs of reported people that should not have entities."""
+    people = coordinator.data.get("people", []) if coordinator.data else []
+    return {
+        str(person.get("id"))
+        for person in people
+        if not include_person(coordinator, person)
+    }
+
+
+@callback
+def async_remove_person_entities(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    domain: str,
+    unique_id_prefixes: tuple[str, ...],
+    keep: Callable[[str], bool],
+) -> None:
+    """Remove registered per-person entities that are no longer wanted.
+
+    Entities are matched by ``{entry_id}_{prefix}{person_id}`` unique IDs
+    within ``domain``; those whose person_id ``keep`` rejects are removed
+    from the entity registry instead of lingering as unavailable.
+    """
+    registry = er.async_get(hass)
+    for registry_entry in er.async_entries_for_config_entry(registry, entry.entry_id):
+        if registry_entry.domain != domain:
+            continue
+        for prefix in unique_id_prefixes:
+            full_prefix = f"{entry.entry_id}_{prefix}"
+            if registry_entry.unique_id.startswith(full_prefix):
+                if not keep(registry_entry.unique_id[len(full_prefix):]):
+                    registry.async_remove(registry_entry.entity_id)
+                break
+
+
+def phone_sensor_enabled_default(coordinator: CaptivePortalCoordinator, person: dict) -> bool:
+    """Return whether a person's phone sensor starts out enabled."""
+    if coordinator.opnsense is not None or coordinator.entry.options.get(
+        CONF_GUEST_PHONE_SENSORS, DEFAULT_GUEST_PHONE_SENSORS
+    ):
+        return True
+    return is_resident(coordinator, person)
+
+
+async def async_add_entities_batched(
+    async_add_entities: AddEntitiesCallback,
+    entities: Iterable[Entity],
+) -> None:
+    """Add entities in fixed-size batches, yielding to the event loop in between.
+
+    ``entities`` may be a generator, so building the entities is spread out
+    as well instead of blocking the loop for thousands of people at once.
+    """
+    batch: list[Entity] = []
+    for entity in entities:
+        batch.append(entity)
+        if len(batch) >= ENTITY_BATCH_SIZE:
+            async_add_entities(batch)
+            batch = []
+            await asyncio.sleep(0)
+
+    if batch:
+        async_add_entities(batch)
@@ -0,0 +1,155 @@
+"""Occupancy aggregates for Captive Portal integration."""
+
+from __future__ import annotations
+
+from collections import deque
+from datetime import datetime
+
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN, OCCUPANCY_STORAGE_VERSION, OCCUPANCY_SAVE_DELAY
+from .storage import CappedDelayStore
+
+HOUR = 3600
+
+
+class OccupancyTracker:
+    """Keep occupancy aggregates up to date from presence transitions.
+
+    Only arrivals and departures touch the aggregates, so a refresh costs
+    O(changes) rather than a pass over history. State is persisted when an
+    ``entry_id`` is given, so dwell times survive a restart.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry_id: str | None = None) -> None:
+        """Initialize the tracker."""
+        self._store: CappedDelayStore | None = None
+        if entry_id is not None:
+            self._store = CappedDelayStore(
+                hass, OCCUPANCY_STORAGE_VERSION, f"{DOMAIN}.{entry_id}.occupancy"
+            )
+        # person_id -> arrival timestamp for everyone currently on site
+        self._present: dict[str, float] = {}
+        # person_id -> seconds on site today, from sessions that have ended
+        self._today: dict[str, float] = {}
+        self._day: str | None = None
+        self._arrivals: deque[float] = deque()
+        self._departures: deque[float] = deque()
+
+    async def async_load(self) -> None:
+        """Load persisted state."""
+        if self._store is not None and (stored := await self._store.async_load()):
+            self._present = stored.get("present", {})
+            self._today = stored.get("today", {})
+            self._day = stored.get("day")
+            self._arrivals = deque(stored.get("arrivals", []))
+            self._departures = deque(stored.get("departures", []))
+
+    async def async_save(self) -> None:
+        """Write state out now, e.g. before the entry unloads."""
+        if self._store is not None:
+            await self._store.async_save(self._data_to_save())
+
+    def seed(self, online: set[str], now: datetime) -> None:
+        """Reconcile persisted state with the first snapshot after startup.
+
+        People still online keep their original arrival time. Transitions
+        that happened while Home Assistant was down can't be timed, so they
+        are not counted: people who left are dropped without adding the
+        downtime to their time on site, and people who came in are treated
+        as present from now on. This also covers a fresh install.
+        """
+        self._roll_day(now)
+        ts = now.timestamp()
+        self._present = {
+            person_id: self._present.get(person_id, ts) for person_id in online
+        }
+        self._schedule_save()
+
+    def apply(self, arrived: set[str], departed: set[str], now: datetime) -> None:
+        """Apply presence transitions observed at ``now``."""
+        self._roll_day(now)
+        ts = now.timestamp()
+        day_start = dt_util.start_of_local_day(now).timestamp()
+
+        for person_id in departed:
+            if (arrived_at := self._present.pop(person_id, None)) is None:
+                continue
+            self._today[person_id] = self._today.get(person_id, 0) + (
+                ts - max(arrived_at, day_start)
+            )
+            self._departures.append(ts)
+
+        for person_id in arrived:
+            if person_id in self._present:
+                continue
+            self._present[person_id] = ts
+            self._arrivals.append(ts)
+
+        self._prune(ts)
+        if arrived or departed:
+            self._schedule_save()
+
+    @property
+    def online_count(self) -> int:
+        """Return the number of people currently on site."""
+        return len(self._present)
+
+    def arrivals_last_hour(self, now: datetime) -> int:
+        """Return the number of arrivals in the past hour."""
+        self._prune(now.timestamp())
+        return len(self._arrivals)
+
+    def departures_last_hour(self, now: datetime) -> int:
+        """Return the number of departures in the past hour."""
+        self._prune(now.timestamp())
+        return len(self._departures)
+
+    def dwell_time(self, person_id: str, now: datetime) -> float | None:
+        """Return seconds since the person arrived, or None if not on site."""
+        if (arrived_at := self._present.get(person_id)) is None:
+            return None
+        return now.timestamp() - arrived_at
+
+    def time_on_site_today(self, person_id: str, now: datetime) -> float:
+        """Return seconds the person has spent on site since local midnight."""
+        total = 0.0 if self._day != _day_key(now) else self._today.get(person_id, 0)
+        if (arrived_at := self._present.get(person_id)) is not None:
+            day_start = dt_util.start_of_local_day(now).timestamp()
+            total += now.timestamp() - max(arrived_at, day_start)
+        return total
+
+    def _roll_day(self, now: datetime) -> None:
+        """Reset daily totals when the local day changes."""
+        if (day := _day_key(now)) != self._day:
+            self._day = day
+            self._today = {}
+
+    def _prune(self, ts: float) -> None:
+        """Drop transitions older than an hour."""
+        cutoff = ts - HOUR
+        while self._arrivals and self._arrivals[0] < cutoff:
+            self._arrivals.popleft()
+        while self._departures and self._departures[0] < cutoff:
+            self._departures.popleft()
+
+    def _schedule_save(self) -> None:
+        """Persist state within OCCUPANCY_SAVE_DELAY of the first unsaved change."""
+        if self._store is not None:
+            self._store.async_delay_save(self._data_to_save, OCCUPANCY_SAVE_DELAY)
+
+    def _data_to_save(self) -> dict:
+        """Return the state to persist."""
+        return {
+            "present": self._present,
+            "today": self._today,
+            "day": self._day,
+            "arrivals": list(self._arrivals),
+            "departures": list(self._departures),
+        }
+
+
+def _day_key(now: datetime) -> str:
+    """Return the local calendar day for ``now``."""
+    return dt_util.as_local(now).date().isoformat()
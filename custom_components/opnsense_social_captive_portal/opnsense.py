@@ -0,0 +1,230 @@
+"""Direct OPNsense data source for Captive Portal integration."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+import aiohttp
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+
+from .const import (
+    DOMAIN,
+    OPNSENSE_API_SESSIONS,
+    OPNSENSE_API_ARP,
+    OPNSENSE_API_NDP,
+    OPNSENSE_INDEX_STORAGE_VERSION,
+    OPNSENSE_INDEX_SAVE_DELAY,
+    OPNSENSE_INDEX_TTL,
+    OPNSENSE_INDEX_SEEN_RESOLUTION,
+)
+from .storage import CappedDelayStore
+
+
+class OpnsenseError(Exception):
+    """Error talking to the OPNsense API."""
+
+
+class OpnsenseAuthError(OpnsenseError):
+    """OPNsense rejected the API key or secret."""
+
+
+class OpnsenseSource:
+    """Build the portal status payload from the OPNsense REST API.
+
+    Captive portal sessions say which MACs belong to which user, and the
+    ARP/NDP tables say which MACs are currently on the network. MACs are
+    joined to people through an index that outlives individual sessions, so
+    a person stays known (and shows as away) after their session expires.
+    The index is persisted when an ``entry_id`` is given, and MACs not seen
+    in a session or the ARP/NDP table for OPNSENSE_INDEX_TTL are evicted.
+    A save is only scheduled when a MAC is added, moves to another person
+    or is evicted, or when its last-seen time moves on by a day.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        host: str,
+        port: int,
+        api_key: str,
+        api_secret: str,
+        verify_ssl: bool = True,
+        ssl: bool = True,
+        entry_id: str | None = None,
+    ) -> None:
+        """Initialize the source."""
+        scheme = "https" if ssl else "http"
+        self.base_url = f"{scheme}://{host}:{port}"
+        # Shared session, so requests reuse pooled connections
+        self.session = async_get_clientsession(hass, verify_ssl=verify_ssl)
+        self._auth = aiohttp.BasicAuth(api_key, api_secret)
+        self._store: CappedDelayStore | None = None
+        if entry_id is not None:
+            self._store = CappedDelayStore(
+                hass,
+                OPNSENSE_INDEX_STORAGE_VERSION,
+                f"{DOMAIN}.{entry_id}.opnsense_index",
+            )
+        # mac -> [person_id, last seen timestamp]
+        self._mac_index: dict[str, list] = {}
+
+    async def async_load(self) -> None:
+        """Load the persisted MAC index."""
+        if self._store is not None and (stored := await self._store.async_load()):
+            self._mac_index = stored.get("macs", {})
+
+    async def async_save(self) -> None:
+        """Write the MAC index out now, e.g. before the entry unloads."""
+        if self._store is not None:
+            await self._store.async_save(self._data_to_save())
+
+    def _data_to_save(self) -> dict:
+        """Return the index to persist."""
+        return {"macs": self._mac_index}
+
+    async def _async_get(self, path: str) -> list | dict:
+        """GET an OPNsense API endpoint and return the decoded JSON."""
+        try:
+            async with self.session.get(
+                f"{self.base_url}{path}",
+                auth=self._auth,
+                timeout=aiohttp.ClientTimeout(total=10),
+            ) as response:
+                if response.status in (401, 403):
+                    raise OpnsenseAuthError(f"Authentication failed: {response.status}")
+                if response.status != 200:
+                    raise OpnsenseError(f"Error fetching {path}: {response.status}")
+                return await response.json()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+            raise OpnsenseError(f"Error communicating with OPNsense: {err}") from err
+
+    async def async_fetch_status(self) -> dict:
+        """Return a status payload in the same shape as the portal's."""
+        sessions, arp, ndp = await asyncio.gather(
+            self._async_get(OPNSENSE_API_SESSIONS),
+            self._async_get(OPNSENSE_API_ARP),
+            self._async_get(OPNSENSE_API_NDP),
+        )
+        now = time.time()
+
+        sessions = _rows(sessions)
+        changed = False
+        for session in sessions:
+            changed |= self._index_session(session, now)
+
+        present = {
+            mac
+            for entry in _rows(arp) + _rows(ndp)
+            if not entry.get("expired") and (mac := _normalize_mac(entry.get("mac")))
+        }
+        changed |= self._touch(present, now)
+        changed |= self._evict(now)
+        if changed and self._store is not None:
+            self._store.async_delay_save(self._data_to_save, OPNSENSE_INDEX_SAVE_DELAY)
+
+        # Group MACs by person, keeping the first MAC seen as the phone
+        grouped: dict[str, list[str]] = {}
+        for mac, (person_id, _) in self._mac_index.items():
+            grouped.setdefault(person_id, []).append(mac)
+
+        people = [
+            {
+                "id": person_id,
+                "name": person_id,
+                "phone_mac": macs[0],
+                "phone_count": len(macs),
+                "online": any(mac in present for mac in macs),
+            }
+            for person_id, macs in grouped.items()
+        ]
+
+        return {
+            "people": people,
+            "people_count": len(people),
+            # OPNsense has no approval queue; a user with an active session
+            # has been let through the portal, so that is what counts here
+            "approved_count": len(
+                {session.get("userName") or session.get("macAddress") for session in sessions}
+            ),
+            "tracked_count": len(self._mac_index),
+            "pending_count": 0,
+            "approval_pending": False,
+            "sessions": [_session_usage(session) for session in sessions],
+        }
+
+    def _index_session(self, session: dict, now: float) -> bool:
+        """Point a session's MAC at the session's user; return True if that's news."""
+        if not (mac := _normalize_mac(session.get("macAddress"))):
+            return False
+        person_id = session.get("userName") or mac
+        if (record := self._mac_index.get(mac)) is None or record[0] != person_id:
+            # A MAC that logs in as someone else simply moves over to them
+            self._mac_index[mac] = [person_id, now]
+            return True
+        return self._seen(record, now)
+
+    def _touch(self, present: set[str], now: float) -> bool:
+        """Refresh the last-seen time of indexed MACs on the network.
+
+        Returns True if any last-seen time changed.
+        """
+        changed = False
+        for mac in present:
+            if (record := self._mac_index.get(mac)) is not None:
+                changed |= self._seen(record, now)
+        return changed
+
+    @staticmethod
+    def _seen(record: list, now: float) -> bool:
+        """Bump a record's last-seen time if it is a day old; return True if bumped.
+
+        Eviction works in weeks, so last-seen only needs day precision, and
+        keeping it coarse stops every poll from counting as a change.
+        """
+        if now - record[1] < OPNSENSE_INDEX_SEEN_RESOLUTION:
+            return False
+        record[1] = now
+        return True
+
+    def _evict(self, now: float) -> bool:
+        """Forget MACs that have not been seen for OPNSENSE_INDEX_TTL."""
+        cutoff = now - OPNSENSE_INDEX_TTL
+        expired = [mac for mac, (_, seen) in self._mac_index.items() if seen < cutoff]
+        for mac in expired:
+            del self._mac_index[mac]
+        return bool(expired)
+
+
+def _rows(payload: list | dict) -> list[dict]:
+    """Return the list of records from a list or search-style response."""
+    if isinstance(payload, dict):
+        return payload.get("rows", [])
+    return payload
+
+
+def _session_usage(session: dict) -> dict:
+    """Return a captive portal session in the portal's session format."""
+    mac = _normalize_mac(session.get("macAddress"))
+    start = session.get("startTime")
+    time_remaining = None
+    if start is not None and (timeout := session.get("acc_session_timeout")):
+        time_remaining = max(0.0, float(start) + float(timeout) - time.time())
+
+    return {
+        "session_id": session.get("sessionId") or mac,
+        "person_id": session.get("userName") or mac,
+        "mac": mac,
+        "bytes_in": session.get("bytes_in", 0),
+        "bytes_out": session.get("bytes_out", 0),
+        "start": start,
+        "time_remaining": time_remaining,
+    }
+
+
+def _normalize_mac(mac: str | None) -> str | None:
+    """Return a MAC address in lowercase colon-separated form."""
+    if not mac:
+        return None
+    return mac.strip().lower().replace("-", ":")
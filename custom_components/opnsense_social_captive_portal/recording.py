@@ -0,0 +1,130 @@
+"""Record and replay of status snapshots for Captive Portal integration."""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import json
+import logging
+import os
+import threading
+from collections.abc import Iterator
+from datetime import datetime
+from itertools import islice
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import (
+    DOMAIN,
+    RECORDING_MAX_BYTES,
+    RECORDING_BACKUPS,
+    RECORDING_FLUSH_RECORDS,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def recording_path(hass: HomeAssistant, entry_id: str) -> str:
+    """Return the path of the active recording file for an entry."""
+    return hass.config.path(f"{DOMAIN}_recordings", f"{entry_id}.jsonl.gz")
+
+
+def _backup_path(path: str, index: int) -> str:
+    """Return the path of a rotated recording file."""
+    if path.endswith(".jsonl.gz"):
+        return f"{path[:-len('.jsonl.gz')]}.{index}.jsonl.gz"
+    return f"{path}.{index}"
+
+
+class TrafficRecorder:
+    """Append status snapshots to a compressed, size-capped rotating file.
+
+    Each line is ``{"t": <unix time>, "data": <status payload>}``. Lines are
+    buffered and written as one gzip member per flush, so compression works
+    across many snapshots instead of one at a time. Flushes run one at a
+    time and in order, and a flush still queued when the entry unloads is
+    cancelled with it; the unload then flushes whatever is left.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
+        """Initialize the recorder."""
+        self.hass = hass
+        self.entry = entry
+        self.path = recording_path(hass, entry.entry_id)
+        self._buffer: list[str] = []
+        # Keeps flushes in order on the event loop
+        self._flush_lock = asyncio.Lock()
+        # A cancelled flush leaves its write running in the executor, so the
+        # file itself is guarded as well
+        self._write_lock = threading.Lock()
+
+    def record(self, data: dict, now: datetime) -> None:
+        """Queue a snapshot; it is serialized now, before anything mutates it."""
+        self._buffer.append(
+            json.dumps({"t": now.timestamp(), "data": data}, separators=(",", ":"))
+        )
+        if len(self._buffer) >= RECORDING_FLUSH_RECORDS:
+            self.entry.async_create_background_task(
+                self.hass, self.async_flush(), f"{DOMAIN} flush recording"
+            )
+
+    async def async_flush(self) -> None:
+        """Write buffered snapshots to disk."""
+        async with self._flush_lock:
+            if not self._buffer:
+                return
+            lines, self._buffer = self._buffer, []
+            await self.hass.async_add_executor_job(self._write, lines)
+
+    def _write(self, lines: list[str]) -> None:
+        """Append lines to the recording, rotating it when it gets too big."""
+        with self._write_lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            if (
+                os.path.exists(self.path)
+                and os.path.getsize(self.path) >= RECORDING_MAX_BYTES
+            ):
+                self._rotate()
+            with gzip.open(self.path, "at", encoding="utf-8") as file:
+                file.write("\n".join(lines) + "\n")
+
+    def _rotate(self) -> None:
+        """Shift existing files up by one, dropping the oldest."""
+        for index in range(RECORDING_BACKUPS - 1, 0, -1):
+            if os.path.exists(src := _backup_path(self.path, index)):
+                os.replace(src, _backup_path(self.path, index + 1))
+        os.replace(self.path, _backup_path(self.path, 1))
+
+
+def iter_recording(path: str) -> Iterator[tuple[float, dict]]:
+    """Yield (timestamp, status payload) pairs from a recording, oldest first.
+
+    ``path`` is the active file; rotated files next to it are read first.
+    A truncated or corrupt file (e.g. after a crash mid-write) stops reading
+    that file only; records read before the damage are kept. Records are
+    decoded lazily, so advance the iterator in the executor, e.g. with
+    read_chunk.
+    """
+    files = [
+        backup
+        for index in range(RECORDING_BACKUPS, 0, -1)
+        if os.path.exists(backup := _backup_path(path, index))
+    ]
+    if os.path.exists(path):
+        files.append(path)
+
+    for file_path in files:
+        try:
+            with gzip.open(file_path, "rt", encoding="utf-8") as file:
+                for line in file:
+                    if line.strip():
+                        record = json.loads(line)
+                        yield record["t"], record["data"]
+        except (EOFError, gzip.BadGzipFile, json.JSONDecodeError) as err:
+            _LOGGER.warning("Stopped reading damaged recording %s: %s", file_path, err)
+
+
+def read_chunk(records: Iterator[tuple[float, dict]], size: int) -> list[tuple[float, dict]]:
+    """Return up to ``size`` records from ``records``. Run this in the executor."""
+    return list(islice(records, size))
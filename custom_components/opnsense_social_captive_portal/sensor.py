@@ -2,17 +2,30 @@
 from __future__ import annotations
 
 from homeassistant.components.sensor import (
+    SensorDeviceClass,
     SensorEntity,
     SensorStateClass,
 )
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.const import UnitOfInformation, UnitOfTime
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from homeassistant.util import dt as dt_util
 
 from . import CaptivePortalCoordinator
-from .const import DOMAIN
+from .const import DOMAIN, SIGNAL_PEOPLE_UPDATED
 from .device import hub_device_info, person_device_info
+from .entity import (
+    CaptivePortalPersonEntity,
+    async_add_entities_batched,
+    async_remove_person_entities,
+    clean_name,
+    hidden_person_ids,
+    include_person,
+    phone_sensor_enabled_default,
+)
 
 
 async def async_setup_entry(
@@ -57,8 +70,74 @@ async def async_setup_entry(
             "people_count",
             "mdi:account-group",
         ),
+        CaptivePortalOccupancySensor(
+            coordinator,
+            entry,
+            "online_count",
+            "Online Count",
+            "mdi:home-account",
+            None,
+        ),
+        CaptivePortalOccupancySensor(
+            coordinator,
+            entry,
+            "arrivals_per_hour",
+            "Arrivals Per Hour",
+            "mdi:account-arrow-left",
+            "arrivals/h",
+        ),
+        CaptivePortalOccupancySensor(
+            coordinator,
+            entry,
+            "departures_per_hour",
+            "Departures Per Hour",
+            "mdi:account-arrow-right",
+            "departures/h",
+        ),
     ]
 
+    # Only OPNsense reports sessions; the portal's status payload has none
+    if coordinator.opnsense is not None:
+        sensors.extend(
+            [
+                CaptivePortalUsageSensor(
+                    coordinator,
+                    entry,
+                    "active_sessions",
+                    "Active Sessions",
+                    "mdi:account-network",
+                ),
+                CaptivePortalUsageSensor(
+                    coordinator,
+                    entry,
+                    "data_in_24h",
+                    "Data In 24h",
+                    "mdi:download-network",
+                ),
+                CaptivePortalUsageSensor(
+                    coordinator,
+                    entry,
+                    "data_out_24h",
+                    "Data Out 24h",
+                    "mdi:upload-network",
+                ),
+                CaptivePortalUsageSensor(
+                    coordinator,
+                    entry,
+                    "data_in_total",
+                    "Data In Total",
+                    "mdi:download-network-outline",
+                ),
+                CaptivePortalUsageSensor(
+                    coordinator,
+                    entry,
+                    "data_out_total",
+                    "Data Out Total",
+                    "mdi:upload-network-outline",
+                ),
+            ]
+        )
+
     async_add_entities(sensors)
 
     # Track which person_phone sensors we've created (per entry)
@@ -66,47 +145,94 @@ async def async_setup_entry(
         hass.data[DOMAIN][entry.entry_id]["created_phone_sensors"] = set()
 
     created_phone_sensors = hass.data[DOMAIN][entry.entry_id]["created_phone_sensors"]
+
+    # Track which people have dwell/time-on-site sensors (per entry)
+    if "created_occupancy_sensors" not in hass.data[DOMAIN][entry.entry_id]:
+        hass.data[DOMAIN][entry.entry_id]["created_occupancy_sensors"] = set()
+
+    created_occupancy_sensors = hass.data[DOMAIN][entry.entry_id]["created_occupancy_sensors"]
+
+    # Track which people have usage sensors (per entry)
+    if "created_usage_sensors" not in hass.data[DOMAIN][entry.entry_id]:
+        hass.data[DOMAIN][entry.entry_id]["created_usage_sensors"] = set()
+
+    created_usage_sensors = hass.data[DOMAIN][entry.entry_id]["created_usage_sensors"]
     
     def _create_person_phone_sensors():
-        """Create person_phone sensors for people with phone devices."""
+        """Create per-person sensors for any new people."""
         if coordinator.data is None:
-            return []
+            return
         
         people = coordinator.data.get("people", [])
-        new_sensors = []
         
         for person in people:
             person_id = person.get("id")
             phone_mac = person.get("phone_mac")
+
+            if not person_id or not include_person(coordinator, person):
+                continue
             
             # Only create sensor for people with phones who we haven't seen
-            if person_id and phone_mac and person_id not in created_phone_sensors:
+            if phone_mac and person_id not in created_phone_sensors:
                 created_phone_sensors.add(person_id)
-                new_sensors.append(
-                    CaptivePortalPersonPhoneSensor(
-                        coordinator,
-                        entry,
-                        person,
-                    )
+                yield CaptivePortalPersonPhoneSensor(
+                    coordinator,
+                    entry,
+                    person,
                 )
-        
-        return new_sensors
+
+            # Duration sensors only for people with phones, like the trackers
+            if phone_mac and person_id not in created_occupancy_sensors:
+                created_occupancy_sensors.add(person_id)
+                yield CaptivePortalPersonDwellTimeSensor(coordinator, entry, person)
+                yield CaptivePortalPersonTimeOnSiteSensor(coordinator, entry, person)
+
+            # Usage sensors only for people who have had a session
+            if (
+                coordinator.opnsense is not None
+                and person_id not in created_usage_sensors
+                and coordinator.usage.has_person(str(person_id))
+            ):
+                created_usage_sensors.add(person_id)
+                yield CaptivePortalPersonUsageSensor(coordinator, entry, person)
     
-    # Create initial person_phone sensors
-    initial_phone_sensors = _create_person_phone_sensors()
-    if initial_phone_sensors:
-        async_add_entities(initial_phone_sensors)
+    # Drop per-person sensors for guests hidden by residents-only mode
+    hidden = hidden_person_ids(coordinator)
+    async_remove_person_entities(
+        hass,
+        entry,
+        "sensor",
+        ("person_phone_", "person_dwell_", "person_time_on_site_", "person_usage_"),
+        lambda person_id: person_id not in hidden,
+    )
+
+    # Create initial per-person sensors in batches
+    await async_add_entities_batched(async_add_entities, _create_person_phone_sensors())
     
     # Listen for new people with phones
-    async def _async_update_listener():
+    @callback
+    def _async_update_listener():
         """Handle updated data from the coordinator."""
-        new_sensors = _create_person_phone_sensors()
-        if new_sensors:
-            async_add_entities(new_sensors)
+        # People who only appear in a replayed recording don't get entities
+        if coordinator.replaying:
+            return
+        if new_sensors := list(_create_person_phone_sensors()):
+            # Tied to the entry, so unloading cancels a batch still being added
+            entry.async_create_background_task(
+                hass,
+                async_add_entities_batched(async_add_entities, new_sensors),
+                f"{DOMAIN} add sensor entities",
+            )
     
     entry.async_on_unload(
         coordinator.async_add_listener(_async_update_listener)
     )
+    # Guests opted in later are added without reloading the entry
+    entry.async_on_unload(
+        async_dispatcher_connect(
+            hass, SIGNAL_PEOPLE_UPDATED.format(entry.entry_id), _async_update_listener
+        )
+    )
 
 
 class CaptivePortalSensor(CoordinatorEntity, SensorEntity):
@@ -160,16 +286,20 @@ class CaptivePortalPersonPhoneSensor(CoordinatorEntity, SensorEntity):
         self._person_id = person_data.get("id")
         self._person_name = person_data.get("name", "Unknown")
         
-        # Clean name for entity_id
-        clean_name = self._person_name.lower().replace(" ", "_")
-        clean_name = "".join(c for c in clean_name if c.isalnum() or c == "_")
-        
         self._attr_name = f"{self._person_name} Phone"
         self._attr_unique_id = f"{entry.entry_id}_person_phone_{self._person_id}"
         self._attr_icon = "mdi:cellphone"
-        self.entity_id = f"sensor.social_captive_portal_{clean_name}_phone"
+        self.entity_id = f"sensor.social_captive_portal_{clean_name(self._person_name)}_phone"
+        self._attr_entity_registry_enabled_default = phone_sensor_enabled_default(
+            coordinator, person_data
+        )
         self._attr_device_info = person_device_info(entry, str(self._person_id), self._person_name)
 
+    async def async_added_to_hass(self) -> None:
+        """Ask the coordinator to download this person's photo."""
+        await super().async_added_to_hass()
+        self.coordinator.async_want_photo(str(self._person_id))
+
     @property
     def native_value(self) -> str | None:
         """Return the MAC address of the person's phone."""
@@ -213,3 +343,179 @@ class CaptivePortalPersonPhoneSensor(CoordinatorEntity, SensorEntity):
                 }
         
         return {"person_id": self._person_id, "person_name": self._person_name}
+
+
+class CaptivePortalOccupancySensor(CoordinatorEntity, SensorEntity):
+    """Representation of a site-wide occupancy aggregate."""
+
+    _attr_state_class = SensorStateClass.MEASUREMENT
+
+    def __init__(
+        self,
+        coordinator: CaptivePortalCoordinator,
+        entry: ConfigEntry,
+        sensor_type: str,
+        name: str,
+        icon: str,
+        unit: str | None,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator)
+        self._sensor_type = sensor_type
+        self._attr_name = f"Captive Portal {name}"
+        self._attr_unique_id = f"{entry.entry_id}_{sensor_type}"
+        self._attr_icon = icon
+        self._attr_native_unit_of_measurement = unit
+        self._attr_device_info = hub_device_info(entry)
+        self.entity_id = f"sensor.social_captive_portal_{sensor_type}"
+
+    @property
+    def native_value(self) -> int | None:
+        """Return the state of the sensor."""
+        if self.coordinator.data is None:
+            return None
+
+        occupancy = self.coordinator.occupancy
+        if self._sensor_type == "arrivals_per_hour":
+            return occupancy.arrivals_last_hour(dt_util.utcnow())
+        if self._sensor_type == "departures_per_hour":
+            return occupancy.departures_last_hour(dt_util.utcnow())
+        return occupancy.online_count
+
+
+class CaptivePortalPersonDwellTimeSensor(CaptivePortalPersonEntity, SensorEntity):
+    """Sensor showing how long a person has been on site in the current visit."""
+
+    _entity_platform = "sensor"
+    _unique_id_prefix = "person_dwell_"
+    _name_suffix = "Dwell Time"
+    _attr_icon = "mdi:timer-outline"
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_native_unit_of_measurement = UnitOfTime.MINUTES
+    # Changes every minute while the person is on site; opt in per person
+    _attr_entity_registry_enabled_default = False
+
+    @property
+    def native_value(self) -> int | None:
+        """Return whole minutes since the person arrived (0 when away)."""
+        if self.coordinator.data is None:
+            return None
+
+        seconds = self.coordinator.occupancy.dwell_time(str(self._person_id), dt_util.utcnow())
+        return int(seconds // 60) if seconds is not None else 0
+
+
+class CaptivePortalPersonTimeOnSiteSensor(CaptivePortalPersonEntity, SensorEntity):
+    """Sensor showing how long a person has been on site today."""
+
+    _entity_platform = "sensor"
+    _unique_id_prefix = "person_time_on_site_"
+    _name_suffix = "Time On Site Today"
+    _attr_icon = "mdi:clock-check-outline"
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _attr_native_unit_of_measurement = UnitOfTime.MINUTES
+    # Changes every minute while the person is on site; opt in per person
+    _attr_entity_registry_enabled_default = False
+
+    @property
+    def native_value(self) -> int | None:
+        """Return whole minutes spent on site since local midnight."""
+        if self.coordinator.data is None:
+            return None
+
+        seconds = self.coordinator.occupancy.time_on_site_today(
+            str(self._person_id), dt_util.utcnow()
+        )
+        return int(seconds // 60)
+
+
+class CaptivePortalUsageSensor(CoordinatorEntity, SensorEntity):
+    """Representation of a site-wide session or bandwidth aggregate."""
+
+    def __init__(
+        self,
+        coordinator: CaptivePortalCoordinator,
+        entry: ConfigEntry,
+        sensor_type: str,
+        name: str,
+        icon: str,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator)
+        self._sensor_type = sensor_type
+        self._attr_name = f"Captive Portal {name}"
+        self._attr_unique_id = f"{entry.entry_id}_{sensor_type}"
+        self._attr_icon = icon
+        self._attr_device_info = hub_device_info(entry)
+        self.entity_id = f"sensor.social_captive_portal_{sensor_type}"
+
+        if sensor_type == "active_sessions":
+            self._attr_state_class = SensorStateClass.MEASUREMENT
+        else:
+            self._attr_device_class = SensorDeviceClass.DATA_SIZE
+            self._attr_native_unit_of_measurement = UnitOfInformation.BYTES
+            self._attr_suggested_unit_of_measurement = UnitOfInformation.MEGABYTES
+            # Rolling windows go up and down; lifetime totals only reset on restart
+            self._attr_state_class = (
+                SensorStateClass.TOTAL_INCREASING
+                if sensor_type.endswith("_total")
+                else SensorStateClass.MEASUREMENT
+            )
+
+    @property
+    def native_value(self) -> int | None:
+        """Return the state of the sensor."""
+        if self.coordinator.data is None:
+            return None
+
+        usage = self.coordinator.usage
+        if self._sensor_type == "active_sessions":
+            return usage.active_sessions
+        if self._sensor_type == "data_in_24h":
+            return usage.site_totals()[0]
+        if self._sensor_type == "data_out_24h":
+            return usage.site_totals()[1]
+        if self._sensor_type == "data_in_total":
+            return usage.total_in
+        return usage.total_out
+
+
+class CaptivePortalPersonUsageSensor(CaptivePortalPersonEntity, SensorEntity):
+    """Sensor showing a person's data usage over the rolling window.
+
+    Only completed time buckets are counted, so the state changes at most
+    once per bucket instead of on every poll. Disabled by default.
+    """
+
+    _entity_platform = "sensor"
+    _unique_id_prefix = "person_usage_"
+    _name_suffix = "Data Usage 24h"
+    _attr_icon = "mdi:swap-vertical"
+    _attr_device_class = SensorDeviceClass.DATA_SIZE
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_native_unit_of_measurement = UnitOfInformation.BYTES
+    _attr_suggested_unit_of_measurement = UnitOfInformation.MEGABYTES
+    _attr_entity_registry_enabled_default = False
+
+    @property
+    def native_value(self) -> int | None:
+        """Return bytes in plus bytes out over completed buckets."""
+        if self.coordinator.data is None:
+            return None
+        return sum(self.coordinator.usage.person_totals(str(self._person_id)))
+
+    @property
+    def extra_state_attributes(self) -> dict:
+        """Return extra state attributes."""
+        bytes_in, bytes_out = self.coordinator.usage.person_totals(str(self._person_id))
+        session = self.coordinator.usage.person_session(str(self._person_id)) or {}
+        return {
+            "person_id": self._person_id,
+            "person_name": self._person_name,
+            "bytes_in": bytes_in,
+            "bytes_out": bytes_out,
+            "session_start": session.get("session_start"),
+            "session_end": session.get("session_end"),
+        }
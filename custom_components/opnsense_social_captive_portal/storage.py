@@ -0,0 +1,45 @@
+"""Storage helpers for Captive Portal integration."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from typing import Any
+
+from homeassistant.core import callback
+from homeassistant.helpers.storage import Store
+
+
+class CappedDelayStore(Store):
+    """Store whose delayed save is not pushed back by later calls.
+
+    Home Assistant's Store moves a pending delayed write out to the latest
+    call's deadline. State that changes on most polls would then never be
+    written until shutdown, so here the first pending call sets the
+    deadline and later ones only swap in fresher data.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        """Initialize the store."""
+        super().__init__(*args, **kwargs)
+        self._save_pending = False
+        self._latest_data_func: Callable[[], Any] | None = None
+
+    @callback
+    def async_delay_save(self, data_func: Callable[[], Any], delay: float = 0) -> None:
+        """Save data at most ``delay`` seconds from the first unsaved change."""
+        self._latest_data_func = data_func
+        if self._save_pending:
+            # Leave the scheduled write alone; it picks up data_func
+            return
+        self._save_pending = True
+        super().async_delay_save(self._latest_data, delay)
+
+    def _latest_data(self) -> Any:
+        """Return the data from the most recent async_delay_save call."""
+        self._save_pending = False
+        return self._latest_data_func()
+
+    async def async_save(self, data: Any) -> None:
+        """Save data now, replacing any pending delayed save."""
+        self._save_pending = False
+        await super().async_save(data)
@@ -0,0 +1,163 @@
+"""Session and bandwidth usage aggregates for Captive Portal integration."""
+
+from __future__ import annotations
+
+from datetime import datetime
+
+from .const import USAGE_BUCKET_SECONDS, USAGE_BUCKET_COUNT
+
+
+class _Buckets:
+    """Fixed-size ring of (bytes_in, bytes_out) time buckets."""
+
+    __slots__ = ("epoch", "slots")
+
+    def __init__(self, epoch: int) -> None:
+        """Initialize an empty ring ending at bucket ``epoch``."""
+        self.epoch = epoch
+        self.slots = [[0, 0] for _ in range(USAGE_BUCKET_COUNT)]
+
+    def advance(self, epoch: int) -> None:
+        """Move the current bucket forward, clearing buckets that expired."""
+        for step in range(min(epoch - self.epoch, USAGE_BUCKET_COUNT)):
+            self.slots[(self.epoch + step + 1) % USAGE_BUCKET_COUNT] = [0, 0]
+        self.epoch = max(self.epoch, epoch)
+
+    def add(self, bytes_in: int, bytes_out: int) -> None:
+        """Add traffic to the current bucket."""
+        slot = self.slots[self.epoch % USAGE_BUCKET_COUNT]
+        slot[0] += bytes_in
+        slot[1] += bytes_out
+
+    def totals(self, include_current: bool = True) -> tuple[int, int]:
+        """Return (bytes_in, bytes_out) summed over the window."""
+        current = self.epoch % USAGE_BUCKET_COUNT
+        total_in = total_out = 0
+        for index, (bytes_in, bytes_out) in enumerate(self.slots):
+            if include_current or index != current:
+                total_in += bytes_in
+                total_out += bytes_out
+        return total_in, total_out
+
+
+class UsageAggregator:
+    """Aggregate per-session byte counters into rolling totals.
+
+    Sessions report cumulative counters, so only the delta since the last
+    poll is added to the current bucket. Memory is bounded by the number of
+    concurrent sessions plus one fixed-size ring per person with traffic in
+    the window, however many sessions come and go.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the aggregator."""
+        # session_id -> (person_id, bytes_in, bytes_out) as last seen
+        self._last: dict[str, tuple[str, int, int]] = {}
+        # person_id -> latest session details
+        self._sessions: dict[str, dict] = {}
+        self._people: dict[str, _Buckets] = {}
+        self._site: _Buckets | None = None
+        self._seeded = False
+        self.total_in = 0
+        self.total_out = 0
+
+    def ingest(self, sessions: list[dict], now: datetime) -> None:
+        """Add the traffic reported by ``sessions`` since the previous poll."""
+        epoch = int(now.timestamp()) // USAGE_BUCKET_SECONDS
+        if self._site is None:
+            self._site = _Buckets(epoch)
+        elif epoch != self._site.epoch:
+            self._advance(epoch)
+
+        seen: dict[str, tuple[str, int, int]] = {}
+        active: dict[str, dict] = {}
+
+        for session in sessions:
+            person_id = str(session.get("person_id") or session.get("mac"))
+            session_id = str(session.get("session_id") or session.get("mac"))
+            bytes_in = int(session.get("bytes_in") or 0)
+            bytes_out = int(session.get("bytes_out") or 0)
+            seen[session_id] = (person_id, bytes_in, bytes_out)
+            active[person_id] = session
+
+            # Counters already present before startup are not new traffic
+            if not self._seeded:
+                continue
+
+            if (last := self._last.get(session_id)) is not None:
+                # A counter that went backwards was reset; count it from zero
+                delta_in = bytes_in - last[1] if bytes_in >= last[1] else bytes_in
+                delta_out = bytes_out - last[2] if bytes_out >= last[2] else bytes_out
+            else:
+                delta_in, delta_out = bytes_in, bytes_out
+
+            if delta_in or delta_out:
+                self._site.add(delta_in, delta_out)
+                if (buckets := self._people.get(person_id)) is None:
+                    buckets = self._people[person_id] = _Buckets(epoch)
+                buckets.add(delta_in, delta_out)
+                self.total_in += delta_in
+                self.total_out += delta_out
+
+        self._last = seen
+        self._sessions = {
+            person_id: _session_details(session, now)
+            for person_id, session in active.items()
+        }
+        self._seeded = True
+
+    def _advance(self, epoch: int) -> None:
+        """Roll every ring forward and drop people with no traffic left."""
+        self._site.advance(epoch)
+        for person_id in list(self._people):
+            buckets = self._people[person_id]
+            buckets.advance(epoch)
+            if buckets.totals() == (0, 0):
+                del self._people[person_id]
+
+    @property
+    def active_sessions(self) -> int:
+        """Return the number of sessions in the last poll."""
+        return len(self._last)
+
+    def site_totals(self) -> tuple[int, int]:
+        """Return site-wide (bytes_in, bytes_out) over the window."""
+        if self._site is None:
+            return 0, 0
+        return self._site.totals()
+
+    def has_person(self, person_id: str) -> bool:
+        """Return True if the person has a session or traffic in the window."""
+        return person_id in self._sessions or person_id in self._people
+
+    def person_totals(self, person_id: str) -> tuple[int, int]:
+        """Return a person's (bytes_in, bytes_out) over completed buckets.
+
+        The bucket still filling up is left out, so the value only changes
+        when a bucket closes rather than on every poll.
+        """
+        if (buckets := self._people.get(person_id)) is None:
+            return 0, 0
+        return buckets.totals(include_current=False)
+
+    def person_session(self, person_id: str) -> dict | None:
+        """Return start/end details of the person's current session."""
+        return self._sessions.get(person_id)
+
+
+def _session_details(session: dict, now: datetime) -> dict:
+    """Return stable session timestamps for a session record."""
+    start = session.get("start")
+    remaining = session.get("time_remaining")
+    end = None
+    if remaining is not None:
+        # Rounded to the minute so the value doesn't drift between polls
+        end = (int(now.timestamp() + float(remaining)) // 60) * 60
+    return {
+        "session_start": datetime.fromtimestamp(float(start), now.tzinfo).isoformat()
+        if start is not None
+        else None,
+        "session_end": datetime.fromtimestamp(end, now.tzinfo).isoformat()
+        if end is not None
+        else None,
+    }
@@ -0,0 +1 @@
+"""Tests for the Captive Portal integration."""
@@ -0,0 +1,113 @@
+"""Benchmark per-person entity setup for large guest lists.
+
+Not collected by default; run it explicitly:
+
+    python -m pytest tests/benchmark_setup.py -s
+
+Each run sets up the sensor, binary_sensor and device_tracker platforms
+through Home Assistant's EntityPlatform, with real entity and device
+registries, against a coordinator holding N people. It reports the total
+setup time and the longest stretch the event loop went without running
+anything else.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from datetime import timedelta
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from homeassistant.helpers.entity_platform import EntityPlatform
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.opnsense_social_captive_portal import (
+    CaptivePortalCoordinator,
+    binary_sensor,
+    device_tracker,
+    sensor,
+)
+from custom_components.opnsense_social_captive_portal.const import (
+    DOMAIN,
+    CONF_HOST,
+    CONF_PORT,
+    ENTITY_BATCH_SIZE,
+)
+
+PLATFORMS = {
+    "sensor": sensor,
+    "binary_sensor": binary_sensor,
+    "device_tracker": device_tracker,
+}
+
+
+async def _max_loop_stall(stop: asyncio.Event, stalls: list[float]) -> None:
+    """Record the longest gap between two turns of the event loop."""
+    last = time.perf_counter()
+    while not stop.is_set():
+        await asyncio.sleep(0)
+        now = time.perf_counter()
+        stalls.append(now - last)
+        last = now
+
+
+@pytest.mark.parametrize("people", [1000, 5000])
+@pytest.mark.parametrize("batch_size", [ENTITY_BATCH_SIZE, 10**9], ids=["batched", "unbatched"])
+async def test_setup_benchmark(hass, people: int, batch_size: int) -> None:
+    """Time setting up every per-person entity for ``people`` people."""
+    # The test harness runs the loop in debug mode, which skews timings
+    hass.loop.set_debug(False)
+    entry = MockConfigEntry(
+        domain=DOMAIN, data={CONF_HOST: "portal.local", CONF_PORT: 3000}
+    )
+    entry.add_to_hass(hass)
+    coordinator = CaptivePortalCoordinator(hass, entry)
+    coordinator.async_config_entry_first_refresh = AsyncMock()
+    coordinator.update_interval = None
+    coordinator.data = {
+        "people": [
+            {
+                "id": index,
+                "name": f"Guest {index}",
+                "phone_mac": f"02:00:00:{index >> 16 & 255:02x}:{index >> 8 & 255:02x}:{index & 255:02x}",
+                "phone_count": 1,
+                "online": index % 2 == 0,
+            }
+            for index in range(people)
+        ],
+        "people_count": people,
+    }
+    hass.data.setdefault(DOMAIN, {})[entry.entry_id] = {"coordinator": coordinator}
+
+    stop = asyncio.Event()
+    stalls: list[float] = []
+    ticker = asyncio.create_task(_max_loop_stall(stop, stalls))
+
+    start = time.perf_counter()
+    with patch(
+        "custom_components.opnsense_social_captive_portal.entity.ENTITY_BATCH_SIZE",
+        batch_size,
+    ):
+        for domain, module in PLATFORMS.items():
+            platform = EntityPlatform(
+                hass=hass,
+                logger=logging.getLogger(__name__),
+                domain=domain,
+                platform_name=DOMAIN,
+                platform=module,
+                scan_interval=timedelta(seconds=30),
+                entity_namespace=None,
+            )
+            await platform.async_setup_entry(entry)
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await ticker
+    entities = len(hass.states.async_all())
+    print(
+        f"\n{people} people, {'unbatched' if batch_size > people else 'batched'}: "
+        f"{entities} entities in {elapsed:.2f}s, "
+        f"longest event loop stall {max(stalls) * 1000:.0f} ms"
+    )
+    await hass.config_entries.async_unload(entry.entry_id)
@@ -0,0 +1,47 @@
+"""Fixtures for Captive Portal tests."""
+from __future__ import annotations
+
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.opnsense_social_captive_portal.const import (
+    DOMAIN,
+    CONF_HOST,
+    CONF_PORT,
+    CONF_SOURCE,
+    CONF_API_KEY,
+    CONF_API_SECRET,
+    CONF_RESIDENTS_ONLY,
+    SOURCE_OPNSENSE,
+)
+
+
+@pytest.fixture
+def portal_entry(hass) -> MockConfigEntry:
+    """Return a config entry for the Captive Portal server source."""
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={CONF_HOST: "portal.local", CONF_PORT: 3000},
+        entry_id="portal_entry",
+    )
+    entry.add_to_hass(hass)
+    return entry
+
+
+@pytest.fixture
+def opnsense_entry(hass) -> MockConfigEntry:
+    """Return a config entry for the direct OPNsense source."""
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            CONF_SOURCE: SOURCE_OPNSENSE,
+            CONF_HOST: "opnsense.local",
+            CONF_PORT: 443,
+            CONF_API_KEY: "key",
+            CONF_API_SECRET: "secret",
+        },
+        options={CONF_RESIDENTS_ONLY: True},
+        entry_id="opnsense_entry",
+    )
+    entry.add_to_hass(hass)
+    return entry
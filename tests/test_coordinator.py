@@ -0,0 +1,189 @@
+"""Tests for the Captive Portal coordinator."""
+from __future__ import annotations
+
+import asyncio
+import gzip
+import json
+
+import pytest
+from homeassistant.exceptions import ServiceValidationError
+
+from custom_components.opnsense_social_captive_portal import (
+    CaptivePortalCoordinator,
+    _async_register_services,
+)
+
+STATUS_URL = "http://portal.local:3000/api/ha/status"
+PHOTO_URL = "http://portal.local:3000/api/ha/photo/{}"
+
+
+def _status(*people: dict) -> dict:
+    return {"people": list(people), "people_count": len(people)}
+
+
+def _write_recording(path, records: list[tuple[float, dict]]) -> str:
+    with gzip.open(path, "wt", encoding="utf-8") as file:
+        for timestamp, data in records:
+            file.write(json.dumps({"t": timestamp, "data": data}) + "\n")
+    return str(path)
+
+
+async def test_photos_fetched_in_background_for_wanted_people(
+    hass, portal_entry, aioclient_mock
+) -> None:
+    """Refresh never downloads photos; wanted ones arrive afterwards."""
+    aioclient_mock.get(
+        STATUS_URL,
+        json=_status(
+            {"id": 1, "name": "A", "online": True, "photo_hash": "h1"},
+            {"id": 2, "name": "B", "online": True, "photo_hash": "h2"},
+        ),
+    )
+    aioclient_mock.get(PHOTO_URL.format(1), content=b"img", headers={"Content-Type": "image/png"})
+    aioclient_mock.get(PHOTO_URL.format(2), status=404)
+
+    coordinator = CaptivePortalCoordinator(hass, portal_entry)
+    await coordinator.async_refresh()
+    assert aioclient_mock.call_count == 1
+    assert coordinator.data["people"][0]["photo"] is None
+
+    coordinator.async_want_photo("1")
+    coordinator.async_want_photo("2")
+    await coordinator._photo_task
+
+    assert coordinator.data["people"][0]["photo"] == "data:image/png;base64,aW1n"
+    assert coordinator.data["people"][1]["photo"] is None
+    assert aioclient_mock.call_count == 3
+
+    # Cached photo and the failed hash are not downloaded again
+    await coordinator.async_refresh()
+    assert coordinator._photo_task.done()
+    assert aioclient_mock.call_count == 4
+    assert coordinator.data["people"][0]["photo"] == "data:image/png;base64,aW1n"
+
+
+async def test_replay_leaves_live_state_alone(
+    hass, portal_entry, aioclient_mock, hass_storage, tmp_path
+) -> None:
+    """Replay fires no events, saves nothing and restores live aggregates."""
+    aioclient_mock.get(STATUS_URL, json=_status({"id": 1, "name": "A", "online": True}))
+    coordinator = CaptivePortalCoordinator(hass, portal_entry)
+    await coordinator.async_refresh()
+    occupancy, usage = coordinator.occupancy, coordinator.usage
+    await hass.async_block_till_done()
+    stored = dict(hass_storage)
+
+    events = []
+    hass.bus.async_listen("captive_portal_arrived", events.append)
+    hass.bus.async_listen("captive_portal_departed", events.append)
+
+    seen = []
+    coordinator.async_add_listener(lambda: seen.append(coordinator.occupancy.online_count))
+    coordinator.update_interval = None
+    path = _write_recording(
+        tmp_path / "recording.jsonl.gz",
+        [
+            (1_000, _status({"id": 2, "online": False}, {"id": 3, "online": False})),
+            (1_060, _status({"id": 2, "online": True}, {"id": 3, "online": True})),
+        ],
+    )
+    await coordinator.async_replay(path, speed=0)
+    await hass.async_block_till_done()
+    await coordinator.async_shutdown()
+
+    assert seen[:2] == [0, 2]
+    assert events == []
+    assert coordinator.occupancy is occupancy
+    assert coordinator.usage is usage
+    assert coordinator._online == {"1"}
+    assert hass_storage == stored
+
+
+async def test_replay_rejects_paths_outside_allowlist(hass) -> None:
+    """Only allowlisted paths can be replayed."""
+    _async_register_services(hass)
+    with pytest.raises(ServiceValidationError):
+        await hass.services.async_call(
+            "captive_portal", "replay", {"path": "/etc/passwd"}, blocking=True
+        )
+
+
+async def test_presence_events_fire_after_data_update(
+    hass, portal_entry, aioclient_mock
+) -> None:
+    """Transitions fire per-person events and one batch, after data is set."""
+    aioclient_mock.get(
+        STATUS_URL,
+        json=_status(
+            {"id": 1, "name": "A", "phone_mac": "aa", "online": True},
+            {"id": 2, "name": "B", "phone_mac": "bb", "online": False},
+        ),
+    )
+    coordinator = CaptivePortalCoordinator(hass, portal_entry)
+    await coordinator.async_refresh()
+
+    events = []
+
+    def _record(event) -> None:
+        online = {p["id"] for p in coordinator.data["people"] if p["online"]}
+        events.append((event.event_type, event.data, online))
+
+    for event_type in (
+        "captive_portal_arrived",
+        "captive_portal_departed",
+        "captive_portal_presence_batch",
+    ):
+        hass.bus.async_listen(event_type, _record)
+
+    aioclient_mock.clear_requests()
+    aioclient_mock.get(
+        STATUS_URL,
+        json=_status(
+            {"id": 1, "name": "A", "phone_mac": "aa", "online": False},
+            {"id": 2, "name": "B", "phone_mac": "bb", "online": True},
+        ),
+    )
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+
+    arrived = {"entry_id": "portal_entry", "person_id": "2", "person_name": "B", "phone_mac": "bb"}
+    departed = {"entry_id": "portal_entry", "person_id": "1", "person_name": "A", "phone_mac": "aa"}
+    assert events == [
+        ("captive_portal_arrived", arrived, {2}),
+        ("captive_portal_departed", departed, {2}),
+        (
+            "captive_portal_presence_batch",
+            {"entry_id": "portal_entry", "arrived": [arrived], "departed": [departed]},
+            {2},
+        ),
+    ]
+
+    # A refresh without transitions fires nothing
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+    assert len(events) == 3
+
+
+async def test_replays_cannot_overlap(hass, portal_entry, aioclient_mock, tmp_path) -> None:
+    """A second replay is refused and the first restores live polling."""
+    aioclient_mock.get(STATUS_URL, json=_status({"id": 1, "online": True}))
+    coordinator = CaptivePortalCoordinator(hass, portal_entry)
+    await coordinator.async_refresh()
+    update_interval, occupancy = coordinator.update_interval, coordinator.occupancy
+
+    path = _write_recording(
+        tmp_path / "recording.jsonl.gz",
+        [(1_000, _status()), (1_001, _status()), (1_002, _status())],
+    )
+    first = hass.async_create_task(coordinator.async_replay(path, speed=100))
+    await asyncio.sleep(0.001)
+    assert coordinator.replaying
+
+    with pytest.raises(ServiceValidationError):
+        await coordinator.async_replay(path, speed=0)
+
+    await first
+    assert not coordinator.replaying
+    assert coordinator.update_interval == update_interval
+    assert coordinator.occupancy is occupancy
+    await coordinator.async_shutdown()
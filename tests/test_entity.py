@@ -0,0 +1,68 @@
+"""Tests for the entity helpers."""
+from __future__ import annotations
+
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+
+from custom_components.opnsense_social_captive_portal import CaptivePortalCoordinator
+
+from custom_components.opnsense_social_captive_portal.const import (
+    DOMAIN,
+    CONF_RESIDENTS_ONLY,
+    SIGNAL_PEOPLE_UPDATED,
+)
+from custom_components.opnsense_social_captive_portal.entity import (
+    async_remove_person_entities,
+    hidden_person_ids,
+)
+
+
+async def test_remove_person_entities(hass, portal_entry) -> None:
+    """Only per-person entities rejected by ``keep`` are removed."""
+    registry = er.async_get(hass)
+    for unique_id in ("approval_pending", "person_1", "person_2"):
+        registry.async_get_or_create(
+            "binary_sensor",
+            DOMAIN,
+            f"{portal_entry.entry_id}_{unique_id}",
+            config_entry=portal_entry,
+        )
+
+    async_remove_person_entities(
+        hass, portal_entry, "binary_sensor", ("person_",), lambda person_id: person_id == "2"
+    )
+
+    remaining = {
+        entry.unique_id
+        for entry in er.async_entries_for_config_entry(registry, portal_entry.entry_id)
+    }
+    assert remaining == {
+        f"{portal_entry.entry_id}_approval_pending",
+        f"{portal_entry.entry_id}_person_2",
+    }
+
+
+async def test_hidden_person_ids(hass, portal_entry) -> None:
+    """Guests are hidden only in residents-only mode, until opted in."""
+    coordinator = CaptivePortalCoordinator(hass, portal_entry)
+    coordinator.data = {"people": [{"id": 1, "resident": True}, {"id": 2}]}
+    assert hidden_person_ids(coordinator) == set()
+
+    hass.config_entries.async_update_entry(portal_entry, options={CONF_RESIDENTS_ONLY: True})
+    assert hidden_person_ids(coordinator) == {"2"}
+
+    signals = []
+    async_dispatcher_connect(
+        hass, SIGNAL_PEOPLE_UPDATED.format(portal_entry.entry_id), lambda: signals.append(1)
+    )
+    coordinator.async_opt_in("2")
+    assert hidden_person_ids(coordinator) == set()
+    assert signals == [1]
+    assert portal_entry.options == {CONF_RESIDENTS_ONLY: True}
+
+
+async def test_residents_only_ignored_for_opnsense(hass, opnsense_entry) -> None:
+    """OPNsense people have no resident flag, so nobody is hidden."""
+    coordinator = CaptivePortalCoordinator(hass, opnsense_entry)
+    coordinator.data = {"people": [{"id": "alice"}]}
+    assert hidden_person_ids(coordinator) == set()
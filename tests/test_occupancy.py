@@ -0,0 +1,79 @@
+"""Tests for the occupancy aggregates."""
+from __future__ import annotations
+
+from datetime import timedelta
+
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from custom_components.opnsense_social_captive_portal.occupancy import OccupancyTracker
+
+
+async def test_seed_after_restart_drops_stale_presence(hass, hass_storage) -> None:
+    """People who left during downtime are not counted as departures."""
+    now = dt_util.now().replace(hour=12, minute=0, second=0, microsecond=0)
+    earlier = now - timedelta(hours=2)
+    hass_storage["captive_portal.entry.occupancy"] = {
+        "version": 1,
+        "key": "captive_portal.entry.occupancy",
+        "data": {
+            "present": {"stayed": earlier.timestamp(), "left": earlier.timestamp()},
+            "today": {},
+            "day": now.date().isoformat(),
+            "arrivals": [],
+            "departures": [],
+        },
+    }
+
+    tracker = OccupancyTracker(hass, "entry")
+    await tracker.async_load()
+    tracker.seed({"stayed", "new"}, now)
+
+    assert tracker.online_count == 2
+    assert tracker.departures_last_hour(now) == 0
+    assert tracker.arrivals_last_hour(now) == 0
+    assert tracker.time_on_site_today("left", now) == 0
+    assert tracker.dwell_time("stayed", now) == 2 * 3600
+    assert tracker.dwell_time("new", now) == 0
+
+
+async def test_apply_updates_aggregates(hass) -> None:
+    """Arrivals and departures update counts and time on site."""
+    now = dt_util.now().replace(hour=12, minute=0, second=0, microsecond=0)
+    tracker = OccupancyTracker(hass, "entry")
+    tracker.seed(set(), now)
+
+    tracker.apply({"a"}, set(), now)
+    later = now + timedelta(minutes=30)
+    tracker.apply(set(), {"a"}, later)
+
+    assert tracker.online_count == 0
+    assert tracker.arrivals_last_hour(later) == 1
+    assert tracker.departures_last_hour(later) == 1
+    assert tracker.time_on_site_today("a", later) == 30 * 60
+
+
+async def test_save_not_pushed_back_by_later_changes(hass, hass_storage) -> None:
+    """A change on every poll still gets written within the save delay."""
+    now = dt_util.now().replace(hour=12, minute=0, second=0, microsecond=0)
+    tracker = OccupancyTracker(hass, "entry")
+    tracker.seed(set(), now)
+
+    # A transition every 10 s would keep sliding a plain delayed save
+    for index in range(1, 3):
+        async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=10 * index))
+        tracker.apply({str(index)}, set(), now + timedelta(seconds=10 * index))
+        await hass.async_block_till_done()
+        assert "captive_portal.entry.occupancy" not in hass_storage
+
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=31))
+    await hass.async_block_till_done()
+    assert set(hass_storage["captive_portal.entry.occupancy"]["data"]["present"]) == {"1", "2"}
+
+
+async def test_async_save_writes_immediately(hass, hass_storage) -> None:
+    """Unload writes state out without waiting for the delay."""
+    tracker = OccupancyTracker(hass, "entry")
+    tracker.seed({"a"}, dt_util.now())
+    await tracker.async_save()
+    assert set(hass_storage["captive_portal.entry.occupancy"]["data"]["present"]) == {"a"}
@@ -0,0 +1,142 @@
+"""Tests for the direct OPNsense data source, against mocked endpoints."""
+from __future__ import annotations
+
+import time
+from datetime import timedelta
+
+import pytest
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from custom_components.opnsense_social_captive_portal.const import OPNSENSE_INDEX_TTL
+from custom_components.opnsense_social_captive_portal.opnsense import (
+    OpnsenseAuthError,
+    OpnsenseSource,
+)
+
+BASE_URL = "http://opnsense.local:8080"
+
+
+def _mock_opnsense(aioclient_mock, sessions: list, arp: list, ndp: list | None = None) -> None:
+    aioclient_mock.clear_requests()
+    aioclient_mock.get(f"{BASE_URL}/api/captiveportal/session/search", json={"rows": sessions})
+    aioclient_mock.get(f"{BASE_URL}/api/diagnostics/interface/getArp", json=arp)
+    aioclient_mock.get(f"{BASE_URL}/api/diagnostics/interface/getNdp", json=ndp or [])
+
+
+def _source(hass, entry_id: str | None = None) -> OpnsenseSource:
+    return OpnsenseSource(
+        hass, "opnsense.local", 8080, "key", "secret", ssl=False, entry_id=entry_id
+    )
+
+
+async def test_fetch_status(hass, aioclient_mock) -> None:
+    """Sessions are joined to ARP/NDP entries by MAC."""
+    _mock_opnsense(
+        aioclient_mock,
+        sessions=[
+            {"sessionId": "s1", "userName": "alice", "macAddress": "AA-AA-AA-AA-AA-01"},
+            {"sessionId": "s2", "userName": "alice", "macAddress": "aa:aa:aa:aa:aa:02"},
+            {"sessionId": "s3", "userName": "bob", "macAddress": "bb:bb:bb:bb:bb:01"},
+        ],
+        arp=[{"mac": "aa:aa:aa:aa:aa:02"}, {"mac": "bb:bb:bb:bb:bb:01", "expired": True}],
+    )
+
+    status = await _source(hass).async_fetch_status()
+
+    people = {person["id"]: person for person in status["people"]}
+    assert people["alice"] == {
+        "id": "alice",
+        "name": "alice",
+        "phone_mac": "aa:aa:aa:aa:aa:01",
+        "phone_count": 2,
+        "online": True,
+    }
+    assert people["bob"]["online"] is False
+    assert status["approved_count"] == 2
+    assert status["tracked_count"] == 3
+    assert len(status["sessions"]) == 3
+
+
+async def test_auth_error(hass, aioclient_mock) -> None:
+    """A 401 is reported as an authentication failure."""
+    aioclient_mock.get(f"{BASE_URL}/api/captiveportal/session/search", status=401)
+    aioclient_mock.get(f"{BASE_URL}/api/diagnostics/interface/getArp", json=[])
+    aioclient_mock.get(f"{BASE_URL}/api/diagnostics/interface/getNdp", json=[])
+
+    with pytest.raises(OpnsenseAuthError):
+        await _source(hass).async_fetch_status()
+
+
+async def test_index_session_moves_mac_and_evicts(hass) -> None:
+    """A MAC follows its latest user and is forgotten after the TTL."""
+    source = _source(hass)
+    now = time.time()
+    source._index_session({"userName": "alice", "macAddress": "aa:aa:aa:aa:aa:01"}, now)
+    source._index_session({"userName": "bob", "macAddress": "AA:AA:AA:AA:AA:01"}, now)
+    assert source._mac_index == {"aa:aa:aa:aa:aa:01": ["bob", now]}
+
+    source._evict(now + OPNSENSE_INDEX_TTL + 1)
+    assert source._mac_index == {}
+
+
+async def test_index_persists(hass, hass_storage, aioclient_mock) -> None:
+    """People whose sessions expired survive a restart through the Store."""
+    hass_storage["captive_portal.entry.opnsense_index"] = {
+        "version": 1,
+        "key": "captive_portal.entry.opnsense_index",
+        "data": {"macs": {"cc:cc:cc:cc:cc:01": ["carol", time.time()]}},
+    }
+    _mock_opnsense(aioclient_mock, sessions=[], arp=[{"mac": "cc:cc:cc:cc:cc:01"}])
+
+    source = _source(hass, "entry")
+    await source.async_load()
+    status = await source.async_fetch_status()
+
+    assert status["people"] == [
+        {
+            "id": "carol",
+            "name": "carol",
+            "phone_mac": "cc:cc:cc:cc:cc:01",
+            "phone_count": 1,
+            "online": True,
+        }
+    ]
+
+
+async def test_index_saved_despite_frequent_polls(hass, hass_storage, aioclient_mock) -> None:
+    """Polling every 10 s doesn't push the index save out indefinitely."""
+    _mock_opnsense(
+        aioclient_mock,
+        sessions=[{"userName": "dave", "macAddress": "dd:dd:dd:dd:dd:01"}],
+        arp=[{"mac": "dd:dd:dd:dd:dd:01"}],
+    )
+    source = _source(hass, "entry")
+    start = dt_util.utcnow()
+    for poll in range(120):
+        async_fire_time_changed(hass, start + timedelta(seconds=10 * poll))
+        await source.async_fetch_status()
+        await hass.async_block_till_done()
+
+    stored = hass_storage["captive_portal.entry.opnsense_index"]["data"]["macs"]
+    assert list(stored) == ["dd:dd:dd:dd:dd:01"]
+
+
+async def test_index_unchanged_not_rescheduled(hass) -> None:
+    """Known MACs seen again within a day are not a change."""
+    source = _source(hass)
+    now = time.time()
+    mac = "aa:aa:aa:aa:aa:01"
+    assert source._index_session({"userName": "alice", "macAddress": mac}, now)
+    assert not source._index_session({"userName": "alice", "macAddress": mac}, now + 10)
+    assert not source._touch({mac}, now + 20)
+    assert source._touch({mac}, now + 2 * 24 * 3600)
+    assert not source._evict(now + 2 * 24 * 3600)
+
+
+async def test_index_async_save(hass, hass_storage) -> None:
+    """Unload writes the index out without waiting for the delay."""
+    source = _source(hass, "entry")
+    source._index_session({"userName": "erin", "macAddress": "ee:ee:ee:ee:ee:01"}, time.time())
+    await source.async_save()
+    assert "ee:ee:ee:ee:ee:01" in hass_storage["captive_portal.entry.opnsense_index"]["data"]["macs"]
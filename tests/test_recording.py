@@ -0,0 +1,50 @@
+"""Tests for traffic recording and replay files."""
+from __future__ import annotations
+
+import asyncio
+import gzip
+
+from homeassistant.util import dt as dt_util
+
+from custom_components.opnsense_social_captive_portal.const import RECORDING_FLUSH_RECORDS
+from custom_components.opnsense_social_captive_portal.recording import (
+    TrafficRecorder,
+    iter_recording,
+)
+
+
+def test_iter_recording_keeps_records_before_damage(tmp_path) -> None:
+    """A truncated file yields the records read before the damage."""
+    backup = tmp_path / "entry.1.jsonl.gz"
+    with gzip.open(backup, "wt", encoding="utf-8") as file:
+        file.write('{"t":1,"data":{"n":1}}\n{"t":2,"data":{"n":2}}\n')
+    # Cut the gzip trailer off, as a crash mid-write would
+    backup.write_bytes(backup.read_bytes()[:-4])
+
+    active = tmp_path / "entry.jsonl.gz"
+    with gzip.open(active, "wt", encoding="utf-8") as file:
+        file.write('{"t":3,"data":{"n":3}}\n{"t":4,"da')
+
+    assert list(iter_recording(str(active))) == [
+        (1, {"n": 1}),
+        (2, {"n": 2}),
+        (3, {"n": 3}),
+    ]
+
+
+async def test_flushes_are_serialised(hass, portal_entry, tmp_path) -> None:
+    """Automatic and explicit flushes don't interleave or reorder records."""
+    recorder = TrafficRecorder(hass, portal_entry)
+    recorder.path = str(tmp_path / "entry.jsonl.gz")
+    now = dt_util.utcnow()
+
+    count = RECORDING_FLUSH_RECORDS * 2 + 5
+    for index in range(count):
+        recorder.record({"n": index}, now)
+        if index == RECORDING_FLUSH_RECORDS * 2:
+            # Race a direct flush against the queued ones
+            await asyncio.gather(recorder.async_flush(), asyncio.sleep(0))
+    await hass.async_block_till_done()
+    await recorder.async_flush()
+
+    assert [data["n"] for _, data in iter_recording(recorder.path)] == list(range(count))
@@ -0,0 +1,84 @@
+"""Tests for the sensor platform."""
+from __future__ import annotations
+
+from homeassistant.util import dt as dt_util
+
+from custom_components.opnsense_social_captive_portal import (
+    CaptivePortalCoordinator,
+    sensor,
+)
+from custom_components.opnsense_social_captive_portal.const import DOMAIN
+
+
+async def _async_setup_sensors(hass, entry) -> list:
+    """Set up the sensor platform for ``entry`` and return its entities."""
+    coordinator = CaptivePortalCoordinator(hass, entry)
+    coordinator.update_interval = None
+    coordinator.data = {"people": [{"id": "alice", "name": "Alice", "phone_mac": "aa:bb:cc:dd:ee:ff"}]}
+    coordinator.usage.ingest(
+        [{"session_id": "s1", "person_id": "alice", "bytes_in": 10, "bytes_out": 5}],
+        dt_util.utcnow(),
+    )
+    hass.data.setdefault(DOMAIN, {})[entry.entry_id] = {"coordinator": coordinator}
+
+    entities = []
+    await sensor.async_setup_entry(hass, entry, entities.extend)
+    return entities
+
+
+async def test_no_entities_for_replayed_people(hass, portal_entry) -> None:
+    """People who only appear in a replay don't get entities."""
+    entities = await _async_setup_sensors(hass, portal_entry)
+    coordinator = hass.data[DOMAIN][portal_entry.entry_id]["coordinator"]
+    count = len(entities)
+    replayed = {"people": [{"id": "bob", "name": "Bob", "phone_mac": "bb:bb:bb:bb:bb:bb"}]}
+
+    coordinator.replaying = True
+    coordinator.async_set_updated_data(replayed)
+    await hass.async_block_till_done()
+    assert len(entities) == count
+
+    coordinator.replaying = False
+    coordinator.async_set_updated_data(replayed)
+    await hass.async_block_till_done()
+    assert len(entities) > count
+
+
+async def test_usage_sensors_only_for_opnsense(hass, portal_entry, opnsense_entry) -> None:
+    """The portal reports no sessions, so it gets no usage sensors."""
+    portal = await _async_setup_sensors(hass, portal_entry)
+    opnsense = await _async_setup_sensors(hass, opnsense_entry)
+
+    usage_types = (sensor.CaptivePortalUsageSensor, sensor.CaptivePortalPersonUsageSensor)
+    assert not [entity for entity in portal if isinstance(entity, usage_types)]
+    assert {type(entity) for entity in opnsense if isinstance(entity, usage_types)} == set(
+        usage_types
+    )
+
+
+async def test_person_sensor_ids(hass, opnsense_entry) -> None:
+    """Per-person sensors keep their entity and unique IDs."""
+    entities = await _async_setup_sensors(hass, opnsense_entry)
+    ids = {
+        (entity.entity_id, entity.unique_id)
+        for entity in entities
+        if isinstance(
+            entity,
+            (
+                sensor.CaptivePortalPersonDwellTimeSensor,
+                sensor.CaptivePortalPersonTimeOnSiteSensor,
+                sensor.CaptivePortalPersonUsageSensor,
+            ),
+        )
+    }
+    assert ids == {
+        ("sensor.social_captive_portal_alice_dwell_time", "opnsense_entry_person_dwell_alice"),
+        (
+            "sensor.social_captive_portal_alice_time_on_site_today",
+            "opnsense_entry_person_time_on_site_alice",
+        ),
+        (
+            "sensor.social_captive_portal_alice_data_usage_24h",
+            "opnsense_entry_person_usage_alice",
+        ),
+    }
@@ -0,0 +1,77 @@
+"""Tests for the session usage aggregates."""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+from custom_components.opnsense_social_captive_portal.const import (
+    USAGE_BUCKET_COUNT,
+    USAGE_BUCKET_SECONDS,
+)
+from custom_components.opnsense_social_captive_portal.usage import UsageAggregator
+
+# Start of a bucket, so offsets within the hour stay in the same bucket
+START = datetime.fromtimestamp(USAGE_BUCKET_SECONDS * 500_000, timezone.utc)
+HOUR = timedelta(seconds=USAGE_BUCKET_SECONDS)
+
+
+def _session(bytes_in: int, bytes_out: int, session_id: str = "s1") -> dict:
+    return {
+        "session_id": session_id,
+        "person_id": "alice",
+        "bytes_in": bytes_in,
+        "bytes_out": bytes_out,
+    }
+
+
+def test_counters_before_startup_are_not_counted() -> None:
+    """The first poll only records counters; later polls add the deltas."""
+    usage = UsageAggregator()
+    usage.ingest([_session(1000, 500)], START)
+    assert usage.site_totals() == (0, 0)
+
+    usage.ingest([_session(1300, 600)], START + timedelta(minutes=1))
+    assert usage.site_totals() == (300, 100)
+    assert (usage.total_in, usage.total_out) == (300, 100)
+    assert usage.active_sessions == 1
+
+
+def test_person_totals_leave_out_current_bucket() -> None:
+    """Per-person totals only change once the hour has closed."""
+    usage = UsageAggregator()
+    usage.ingest([], START)
+    usage.ingest([_session(100, 10)], START + timedelta(minutes=5))
+    usage.ingest([_session(150, 20)], START + timedelta(minutes=10))
+    assert usage.person_totals("alice") == (0, 0)
+    assert usage.site_totals() == (150, 20)
+
+    usage.ingest([_session(200, 30)], START + HOUR)
+    assert usage.person_totals("alice") == (150, 20)
+    assert usage.site_totals() == (200, 30)
+
+
+def test_counter_reset_counts_from_zero() -> None:
+    """A counter that goes backwards was reset, so its value is all new."""
+    usage = UsageAggregator()
+    usage.ingest([_session(0, 0)], START)
+    usage.ingest([_session(500, 50)], START + timedelta(minutes=1))
+    usage.ingest([_session(40, 5)], START + timedelta(minutes=2))
+    assert usage.site_totals() == (540, 55)
+
+
+def test_window_expires_after_bucket_count() -> None:
+    """Traffic older than the window is dropped, along with idle people."""
+    usage = UsageAggregator()
+    usage.ingest([_session(0, 0)], START)
+    usage.ingest([_session(100, 10)], START + timedelta(minutes=1))
+
+    # Still inside the window one bucket before it ends
+    usage.ingest([], START + HOUR * (USAGE_BUCKET_COUNT - 1))
+    assert usage.site_totals() == (100, 10)
+    assert usage.person_totals("alice") == (100, 10)
+
+    # Many more buckets than the ring holds have gone by
+    usage.ingest([], START + HOUR * (USAGE_BUCKET_COUNT + 6))
+    assert usage.site_totals() == (0, 0)
+    assert usage.person_totals("alice") == (0, 0)
+    assert not usage.has_person("alice")
+    assert (usage.total_in, usage.total_out) == (100, 10)